@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional
+
+# Domyślny czas życia wpisów w sekundach (zmienna CACHE_TIMEOUT z pliku .env)
+CACHE_TIMEOUT = int(os.environ.get('CACHE_TIMEOUT', 3600))
+
+# Co ile zapisów z bazy sqlite usuwane są wpisy przeterminowane i nadmiarowe
+PRUNE_EVERY = 100
+
+
+def _tagged(value: Any) -> Any:
+    """Postać wartości z jawnym typem do skrótu.
+
+    Typy natywne JSON (str, int, float, bool, None) pozostają bez zmian,
+    pozostałe opakowywane są w słownik {nazwa typu: wartość}, więc np.
+    Decimal('1') i napis '1' albo krotka i lista dają różne klucze.
+    """
+    if value is None or type(value) in (str, int, float, bool):
+        return value
+    if isinstance(value, Mapping):
+        if all(type(key) is str for key in value):
+            return {'dict': {key: _tagged(item) for key, item in value.items()}}
+        items = [[_tagged(key), _tagged(item)] for key, item in value.items()]
+        return {'dict_items': sorted(items, key=_canonical_json)}
+    if type(value) in (list, tuple):
+        return {type(value).__name__: [_tagged(item) for item in value]}
+    return {f"{type(value).__module__}.{type(value).__qualname__}": str(value)}
+
+
+def _canonical_json(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def assessment_key(documents: Mapping, risk_weights: Mapping, schema_version: int) -> str:
+    """Kanoniczny skrót treści dokumentów, wag i wersji schematu.
+
+    Kolejność kluczy nie ma znaczenia, więc ten sam komplet dokumentów
+    przesłany ponownie (np. przez innego pośrednika) daje ten sam klucz.
+    Typy wartości są częścią skrótu (patrz `_tagged`).
+    """
+    payload = _canonical_json(_tagged(
+        {'schema_version': schema_version, 'risk_weights': risk_weights, 'documents': documents}
+    ))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class AssessmentCache:
+    """Dwupoziomowy bufor wyników oceny ryzyka.
+
+    Poziom pierwszy to LRU w pamięci procesu z limitem liczby wpisów i TTL.
+    Opcjonalny poziom drugi to baza sqlite współdzielona przez procesy
+    robocze, ograniczona tym samym TTL i limitem `max_disk_entries` wpisów
+    (porządkowana co PRUNE_EVERY zapisów). Wpisy przechowywane są jako JSON,
+    więc każdy odczyt zwraca niezależną kopię wyniku.
+    """
+
+    def __init__(self,
+                 max_entries: int = 10000,
+                 ttl_seconds: float = CACHE_TIMEOUT,
+                 db_path: Optional[str] = None,
+                 max_disk_entries: int = 100000):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.max_disk_entries = max_disk_entries
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._metrics = {
+            'hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'stores': 0,
+            'disk_evictions': 0,
+            'compute_seconds': 0.0
+        }
+
+        self._db = None
+        if db_path is not None:
+            self._db = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS assessments '
+                '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+            self._db.execute('CREATE INDEX IF NOT EXISTS assessments_expires_at ON assessments (expires_at)')
+            self._prune_disk()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Wynik z bufora lub None (brak wpisu albo wpis przeterminowany)."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= now:
+                    self._entries.move_to_end(key)
+                    self._metrics['hits'] += 1
+                    return json.loads(value)
+                del self._entries[key]
+                self._metrics['expirations'] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    'SELECT value, expires_at FROM assessments WHERE key = ?', (key,)
+                ).fetchone()
+                if row is not None and row[1] >= now:
+                    self._store(key, row[0], row[1])
+                    self._metrics['disk_hits'] += 1
+                    return json.loads(row[0])
+
+            self._metrics['misses'] += 1
+            return None
+
+    def put(self, key: str, result: Dict, compute_seconds: float = 0.0) -> None:
+        """Zapis wyniku; `compute_seconds` to czas wyliczenia pominięty przy trafieniach."""
+        value = json.dumps(result, ensure_ascii=False)
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._metrics['stores'] += 1
+            self._metrics['compute_seconds'] += compute_seconds
+            self._store(key, value, expires_at)
+            if self._db is not None:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO assessments (key, value, expires_at) VALUES (?, ?, ?)',
+                    (key, value, expires_at)
+                )
+                if self._metrics['stores'] % PRUNE_EVERY == 0:
+                    self._prune_disk()
+                else:
+                    self._db.commit()
+
+    def _prune_disk(self) -> None:
+        """Usunięcie z bazy wpisów przeterminowanych i najstarszych ponad limit."""
+        self._db.execute('DELETE FROM assessments WHERE expires_at < ?', (time.time(),))
+        removed = self._db.execute(
+            'DELETE FROM assessments WHERE key IN '
+            '(SELECT key FROM assessments ORDER BY expires_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_disk_entries,)
+        ).rowcount
+        self._metrics['disk_evictions'] += max(removed, 0)
+        self._db.commit()
+
+    def _store(self, key: str, value: str, expires_at: float) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._metrics['evictions'] += 1
+
+    def clear(self) -> None:
+        """Usunięcie wszystkich wpisów z obu poziomów."""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute('DELETE FROM assessments')
+                self._db.commit()
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def stats(self) -> Dict:
+        """Metryki trafień oraz szacowany czas zaoszczędzony przez bufor."""
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['entries'] = len(self._entries)
+
+        hits = metrics['hits'] + metrics['disk_hits']
+        lookups = hits + metrics['misses']
+        metrics['hit_rate'] = hits / lookups if lookups else 0.0
+        # Średni czas wyliczenia wyniku razy liczba trafień
+        metrics['saved_seconds'] = hits * metrics.pop('compute_seconds') / max(metrics['stores'], 1)
+        return metrics
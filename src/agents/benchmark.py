@@ -0,0 +1,84 @@
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from agents.document_risk_agent import DocumentRiskAgent
+
+CONTRACT_TYPES = ['permanent', 'fixed_term', 'b2b', 'temporary', 'other']
+
+
+def random_application(rng: np.random.Generator, missing_rate: float = 0.05) -> Dict[str, dict]:
+    """Losowy wniosek - część dokumentów może brakować, wycena majątku jest opcjonalna."""
+    documents = {
+        'financial_statement': {
+            'assets': float(rng.uniform(1e4, 2e6)),
+            'liabilities': float(rng.uniform(0, 1e6)),
+            'revenue': float(rng.uniform(1e4, 1e6)),
+            'profit': float(rng.uniform(-1e5, 2e5))
+        },
+        'income_statement': {
+            'monthly_income': float(rng.uniform(0, 20000)),
+            'employment_period': int(rng.integers(0, 120)),
+            'position': 'Specialist'
+        },
+        'employment_contract': {
+            'contract_type': str(rng.choice(CONTRACT_TYPES)),
+            'start_date': '2020-01-01',
+            'salary': float(rng.uniform(3000, 20000))
+        },
+        'credit_history': {
+            'credit_score': float(rng.random()),
+            'payment_history': float(rng.random()),
+            'active_loans': int(rng.integers(0, 5))
+        }
+    }
+    if rng.random() < 0.5:
+        documents['property_valuation'] = {
+            'property_value': float(rng.uniform(0, 2e6)),
+            'valuation_date': '2024-01-01',
+            'property_type': 'flat'
+        }
+    return {key: content for key, content in documents.items() if rng.random() >= missing_rate}
+
+
+def benchmark_concurrency(n_applications: int = 5000,
+                          max_workers: int = 8,
+                          seed: int = 0) -> dict:
+    """Równoległa ocena wniosków przez jedną instancję agenta.
+
+    Wyniki z puli wątków porównywane są z oceną sekwencyjną tych samych
+    wniosków; każda rozbieżność oznacza współdzielony stan między wnioskami.
+    """
+    rng = np.random.default_rng(seed)
+    applications = [random_application(rng) for _ in range(n_applications)]
+    agent = DocumentRiskAgent()
+
+    def assess(application: Dict[str, dict]) -> Dict:
+        return agent.calculate_risk_score(agent.validate_documents(application))
+
+    start = time.perf_counter()
+    expected: List[Dict] = [assess(application) for application in applications]
+    sequential_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(assess, applications, chunksize=16))
+    threaded_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    agent.assess_applications(applications)
+    batch_s = time.perf_counter() - start
+
+    return {
+        'mismatches': sum(result != reference for result, reference in zip(results, expected)),
+        'sequential_per_s': n_applications / sequential_s,
+        'threaded_per_s': n_applications / threaded_s,
+        'batch_per_s': n_applications / batch_s
+    }
+
+
+# Benchmark współbieżności agenta
+if __name__ == "__main__":
+    for key, value in benchmark_concurrency().items():
+        print(f"{key}: {value:.4g}" if isinstance(value, float) else f"{key}: {value}")
@@ -1,53 +1,148 @@
+import math
+import numbers
+from collections import abc
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Mapping, Tuple, Optional
 from dataclasses import dataclass
 from datetime import datetime
+from types import MappingProxyType
+import time
+
+from agents.assessment_cache import AssessmentCache, assessment_key
+
+# Wymagane pola dla każdego typu dokumentu
+REQUIRED_FIELDS = {
+    'financial': ['assets', 'liabilities', 'revenue', 'profit'],
+    'income': ['monthly_income', 'employment_period', 'position'],
+    'employment': ['contract_type', 'start_date', 'salary'],
+    'credit': ['credit_score', 'payment_history', 'active_loans'],
+    'property': ['property_value', 'valuation_date', 'property_type']
+}
+
+# Pola używane w scoringu jako liczby (skończone liczby rzeczywiste)
+NUMERIC_FIELDS = {
+    'financial': ['assets', 'liabilities', 'revenue', 'profit'],
+    'income': ['monthly_income', 'employment_period'],
+    'credit': ['credit_score', 'payment_history'],
+    'property': ['property_value']
+}
+
+CONTRACT_SCORES = {
+    'permanent': 1.0,
+    'fixed_term': 0.7,
+    'b2b': 0.6,
+    'temporary': 0.4
+}
+
+RISK_CATEGORIES = [
+    "Wysokie ryzyko",
+    "Średnio-wysokie ryzyko",
+    "Średnie ryzyko",
+    "Średnio-niskie ryzyko",
+    "Niskie ryzyko"
+]
+
+# Komunikat dla wniosków z niepoprawnymi wartościami w polach liczbowych
+INVALID_VALUES_MESSAGE = 'Niepoprawne wartości liczbowe w dokumentach'
+
+# Rekomendacje dla komponentów ocenionych poniżej 0.4
+RECOMMENDATIONS = {
+    'financial_stability': "Zalecana poprawa stabilności finansowej",
+    'income_reliability': "Wymagane dodatkowe potwierdzenie źródeł dochodu",
+    'employment_stability': "Rozważ zabezpieczenie dodatkowe ze względu na niestabilność zatrudnienia",
+    'credit_history': "Wymagane wyjaśnienie historii kredytowej",
+    'assets': "Rozważ dodatkowe zabezpieczenie majątkowe"
+}
+
+class _FrozenSlots:
+    """Obsługa pickle/deepcopy dla zamrożonych klas ze slotami (bez __dict__)."""
+    __slots__ = ()
+
+    def __getstate__(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state: Dict) -> None:
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+
+@dataclass(frozen=True)
+class DocumentSpec(_FrozenSlots):
+    """Niezmienny opis wymaganego dokumentu, współdzielony przez wszystkie wnioski."""
+    __slots__ = ('name', 'type', 'required')
 
-@dataclass
-class Document:
     name: str
     type: str
-    content: dict
     required: bool
-    provided: bool = False
-    validation_status: bool = False
-    validation_message: str = ""
+
+
+@dataclass(frozen=True)
+class Document(_FrozenSlots):
+    """Stan dokumentu w jednym wniosku - tworzony per wywołanie, nigdy modyfikowany.
+
+    Treść jest kopiowana i udostępniana tylko do odczytu, więc późniejsze
+    zmiany słownika wywołującego nie wpływają na dokument. Treść, która nie
+    jest słownikiem (np. lista), zastępowana jest pustą i dokument jest
+    oznaczany jako niepoprawny.
+    """
+    __slots__ = ('name', 'type', 'content', 'required', 'provided',
+                 'validation_status', 'validation_message')
+
+    name: str
+    type: str
+    content: Mapping
+    required: bool
+    provided: bool
+    validation_status: bool
+    validation_message: str
+
+    def __post_init__(self) -> None:
+        if _is_mapping(self.content):
+            object.__setattr__(self, 'content', MappingProxyType(dict(self.content)))
+        else:
+            object.__setattr__(self, 'content', _EMPTY_CONTENT)
+            object.__setattr__(self, 'validation_status', False)
+
+    def __getstate__(self) -> Dict:
+        # mappingproxy nie jest serializowalny - zapisywana jest zwykła kopia
+        state = super().__getstate__()
+        state['content'] = dict(self.content)
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        super().__setstate__(state)
+        self.__post_init__()
+
+
+DOCUMENT_SCHEMA: Mapping[str, DocumentSpec] = MappingProxyType({
+    'financial_statement': DocumentSpec("Sprawozdanie finansowe", "financial", True),
+    'income_statement': DocumentSpec("Zaświadczenie o dochodach", "income", True),
+    'employment_contract': DocumentSpec("Umowa o pracę", "employment", True),
+    'credit_history': DocumentSpec("Historia kredytowa", "credit", True),
+    'property_valuation': DocumentSpec("Wycena majątku", "property", False)
+})
+
+_EMPTY_CONTENT: Mapping = MappingProxyType({})
+
+_NUMERIC_FIELD_NAMES = frozenset(field for fields in NUMERIC_FIELDS.values() for field in fields)
+_PLAIN_NUMBER_TYPES = frozenset({int, float})
+
+# Wersja schematu i reguł oceny - zmiana unieważnia zbuforowane wyniki
+SCHEMA_VERSION = 1
+
 
 class DocumentRiskAgent:
-    def __init__(self):
-        self.required_documents = {
-            'financial_statement': Document(
-                name="Sprawozdanie finansowe",
-                type="financial",
-                content={},
-                required=True
-            ),
-            'income_statement': Document(
-                name="Zaświadczenie o dochodach",
-                type="income",
-                content={},
-                required=True
-            ),
-            'employment_contract': Document(
-                name="Umowa o pracę",
-                type="employment",
-                content={},
-                required=True
-            ),
-            'credit_history': Document(
-                name="Historia kredytowa",
-                type="credit",
-                content={},
-                required=True
-            ),
-            'property_valuation': Document(
-                name="Wycena majątku",
-                type="property",
-                content={},
-                required=False
-            )
-        }
+    """Agent oceny ryzyka na podstawie dokumentów.
+
+    Agent nie przechowuje stanu wniosków - schemat dokumentów i wagi są
+    tylko do odczytu, a każde wywołanie validate_documents tworzy nowe
+    obiekty Document. Jedną instancję można więc wywoływać z wielu wątków.
+    """
+
+    def __init__(self, cache: Optional[AssessmentCache] = None):
+        self.required_documents = DOCUMENT_SCHEMA
+        self.cache = cache
         
         self.risk_weights = {
             'financial_stability': 0.3,
@@ -57,75 +152,112 @@ class DocumentRiskAgent:
             'assets': 0.1
         }
 
+    def assess_documents(self, provided_documents: Dict[str, dict]) -> Dict:
+        """Walidacja i ocena ryzyka z użyciem bufora wyników (jeśli skonfigurowany).
+
+        Klucz bufora obejmuje treść dokumentów ze schematu, bieżące wagi
+        i SCHEMA_VERSION, więc zmiana wag automatycznie pomija stare wpisy.
+        """
+        if self.cache is None:
+            return self.calculate_risk_score(self.validate_documents(provided_documents))
+
+        key = assessment_key(
+            {doc_key: provided_documents[doc_key]
+             for doc_key in self.required_documents if doc_key in provided_documents},
+            self.risk_weights,
+            SCHEMA_VERSION
+        )
+        result = self.cache.get(key)
+        if result is None:
+            start = time.perf_counter()
+            result = self.calculate_risk_score(self.validate_documents(provided_documents))
+            self.cache.put(key, result, time.perf_counter() - start)
+        return result
+
     def validate_documents(self, provided_documents: Dict[str, dict]) -> Dict[str, Document]:
         """Sprawdzenie kompletności i poprawności dokumentów."""
-        validation_results = self.required_documents.copy()
+        validation_results = {}
         
-        for doc_key, doc_content in provided_documents.items():
-            if doc_key in validation_results:
-                doc = validation_results[doc_key]
-                doc.provided = True
-                doc.content = doc_content
-                
+        for doc_key, spec in self.required_documents.items():
+            if doc_key in provided_documents:
+                content = provided_documents[doc_key]
                 # Walidacja specyficzna dla typu dokumentu
-                validation_status, message = self._validate_document_content(doc)
-                doc.validation_status = validation_status
-                doc.validation_message = message
-                
-                validation_results[doc_key] = doc
+                validation_status, message = self._validate_document_content(spec.type, content)
+                validation_results[doc_key] = Document(
+                    spec.name, spec.type, content, spec.required, True, validation_status, message
+                )
+            else:
+                validation_results[doc_key] = Document(
+                    spec.name, spec.type, _EMPTY_CONTENT, spec.required, False, False, ""
+                )
         
         return validation_results
 
-    def _validate_document_content(self, document: Document) -> Tuple[bool, str]:
+    def _validate_document_content(self, doc_type: str, content: Mapping) -> Tuple[bool, str]:
         """Walidacja zawartości dokumentu."""
-        if document.type == "financial":
-            return self._validate_financial_statement(document.content)
-        elif document.type == "income":
-            return self._validate_income_statement(document.content)
-        elif document.type == "employment":
-            return self._validate_employment_contract(document.content)
-        elif document.type == "credit":
-            return self._validate_credit_history(document.content)
-        elif document.type == "property":
-            return self._validate_property_valuation(document.content)
+        if doc_type == "financial":
+            return self._validate_financial_statement(content)
+        elif doc_type == "income":
+            return self._validate_income_statement(content)
+        elif doc_type == "employment":
+            return self._validate_employment_contract(content)
+        elif doc_type == "credit":
+            return self._validate_credit_history(content)
+        elif doc_type == "property":
+            return self._validate_property_valuation(content)
         
         return False, "Nieznany typ dokumentu"
 
     def _validate_financial_statement(self, content: dict) -> Tuple[bool, str]:
-        required_fields = ['assets', 'liabilities', 'revenue', 'profit']
-        return self._check_required_fields(content, required_fields)
+        return self._check_required_fields(content, REQUIRED_FIELDS['financial'])
 
     def _validate_income_statement(self, content: dict) -> Tuple[bool, str]:
-        required_fields = ['monthly_income', 'employment_period', 'position']
-        return self._check_required_fields(content, required_fields)
+        return self._check_required_fields(content, REQUIRED_FIELDS['income'])
 
     def _validate_employment_contract(self, content: dict) -> Tuple[bool, str]:
-        required_fields = ['contract_type', 'start_date', 'salary']
-        return self._check_required_fields(content, required_fields)
+        return self._check_required_fields(content, REQUIRED_FIELDS['employment'])
 
     def _validate_credit_history(self, content: dict) -> Tuple[bool, str]:
-        required_fields = ['credit_score', 'payment_history', 'active_loans']
-        return self._check_required_fields(content, required_fields)
+        return self._check_required_fields(content, REQUIRED_FIELDS['credit'])
 
     def _validate_property_valuation(self, content: dict) -> Tuple[bool, str]:
-        required_fields = ['property_value', 'valuation_date', 'property_type']
-        return self._check_required_fields(content, required_fields)
+        return self._check_required_fields(content, REQUIRED_FIELDS['property'])
 
     def _check_required_fields(self, content: dict, required_fields: List[str]) -> Tuple[bool, str]:
         """Sprawdzenie czy wszystkie wymagane pola są obecne."""
+        if not _is_mapping(content):
+            content = _EMPTY_CONTENT
         missing_fields = [field for field in required_fields if field not in content]
         
         if missing_fields:
             return False, f"Brakujące pola: {', '.join(missing_fields)}"
+
+        invalid_fields = _invalid_fields(content, required_fields)
+        if invalid_fields:
+            return False, f"{INVALID_VALUES_MESSAGE}: {', '.join(invalid_fields)}"
         return True, "Dokument poprawny"
 
     def calculate_risk_score(self, validated_documents: Dict[str, Document]) -> Dict:
-        """Obliczenie scoringu ryzyka na podstawie dokumentów."""
-        if not self._check_required_documents(validated_documents):
+        """Obliczenie scoringu ryzyka na podstawie dokumentów.
+
+        Wniosek z wartością, która nie jest skończoną liczbą (np. tekst,
+        Decimal, None, NaN), dostaje błąd INVALID_VALUES_MESSAGE - tak samo
+        jak w assess_applications.
+        """
+        missing_documents = self._get_missing_documents(validated_documents)
+        if missing_documents:
             return {
                 'status': 'error',
                 'message': 'Brak wymaganych dokumentów',
-                'missing_documents': self._get_missing_documents(validated_documents)
+                'missing_documents': missing_documents
+            }
+
+        invalid_documents = self._get_invalid_documents(validated_documents)
+        if invalid_documents:
+            return {
+                'status': 'error',
+                'message': INVALID_VALUES_MESSAGE,
+                'missing_documents': invalid_documents
             }
 
         risk_components = {
@@ -151,29 +283,31 @@ class DocumentRiskAgent:
             'recommendations': self._generate_recommendations(risk_components)
         }
 
-    def _check_required_documents(self, documents: Dict[str, Document]) -> bool:
-        """Sprawdzenie czy wszystkie wymagane dokumenty są dostarczone i poprawne."""
-        for doc in documents.values():
-            if doc.required and (not doc.provided or not doc.validation_status):
-                return False
-        return True
-
     def _get_missing_documents(self, documents: Dict[str, Document]) -> List[str]:
-        """Lista brakujących lub niepoprawnych dokumentów."""
+        """Lista brakujących lub niekompletnych dokumentów wymaganych."""
         missing = []
         for doc_key, doc in documents.items():
-            if doc.required and (not doc.provided or not doc.validation_status):
+            if doc.required and (not doc.provided or (
+                    not doc.validation_status and not doc.content.keys() >= set(REQUIRED_FIELDS[doc.type]))):
                 missing.append(doc.name)
         return missing
 
+    def _get_invalid_documents(self, documents: Dict[str, Document]) -> List[str]:
+        """Lista dostarczonych dokumentów z niepoprawnymi wartościami (także opcjonalnych)."""
+        return [
+            doc.name for doc in documents.values()
+            if doc.provided and not doc.validation_status
+            and _invalid_fields(doc.content, REQUIRED_FIELDS[doc.type])
+        ]
+
     def _assess_financial_stability(self, documents: Dict[str, Document]) -> float:
         """Ocena stabilności finansowej."""
         financial_doc = documents['financial_statement'].content
         
-        assets = financial_doc.get('assets', 0)
-        liabilities = financial_doc.get('liabilities', 0)
-        revenue = financial_doc.get('revenue', 0)
-        profit = financial_doc.get('profit', 0)
+        assets = float(financial_doc.get('assets', 0))
+        liabilities = float(financial_doc.get('liabilities', 0))
+        revenue = float(financial_doc.get('revenue', 0))
+        profit = float(financial_doc.get('profit', 0))
 
         if assets == 0 or revenue == 0:
             return 0.0
@@ -188,8 +322,8 @@ class DocumentRiskAgent:
         """Ocena wiarygodności dochodów."""
         income_doc = documents['income_statement'].content
         
-        monthly_income = income_doc.get('monthly_income', 0)
-        employment_period = income_doc.get('employment_period', 0)
+        monthly_income = float(income_doc.get('monthly_income', 0))
+        employment_period = float(income_doc.get('employment_period', 0))
         
         income_score = min(monthly_income / 10000, 1)  # Normalizacja do 10000
         period_score = min(employment_period / 60, 1)  # Normalizacja do 5 lat
@@ -201,21 +335,14 @@ class DocumentRiskAgent:
         employment_doc = documents['employment_contract'].content
         
         contract_type = employment_doc.get('contract_type', '')
-        contract_scores = {
-            'permanent': 1.0,
-            'fixed_term': 0.7,
-            'b2b': 0.6,
-            'temporary': 0.4
-        }
-        
-        return contract_scores.get(contract_type, 0.0)
+        return CONTRACT_SCORES.get(contract_type, 0.0)
 
     def _assess_credit_history(self, documents: Dict[str, Document]) -> float:
         """Ocena historii kredytowej."""
         credit_doc = documents['credit_history'].content
         
-        credit_score = credit_doc.get('credit_score', 0)
-        payment_history = credit_doc.get('payment_history', 0)
+        credit_score = float(credit_doc.get('credit_score', 0))
+        payment_history = float(credit_doc.get('payment_history', 0))
         
         return (credit_score * 0.6 + payment_history * 0.4)
 
@@ -225,7 +352,7 @@ class DocumentRiskAgent:
             return 0.5  # Neutralna ocena jeśli brak dokumentu
             
         property_doc = documents['property_valuation'].content
-        property_value = property_doc.get('property_value', 0)
+        property_value = float(property_doc.get('property_value', 0))
         
         return min(property_value / 1000000, 1)  # Normalizacja do 1000000
 
@@ -244,25 +371,189 @@ class DocumentRiskAgent:
 
     def _generate_recommendations(self, risk_components: Dict[str, float]) -> List[str]:
         """Generowanie rekomendacji na podstawie oceny komponentów."""
-        recommendations = []
-        
-        if risk_components['financial_stability'] < 0.4:
-            recommendations.append("Zalecana poprawa stabilności finansowej")
-            
-        if risk_components['income_reliability'] < 0.4:
-            recommendations.append("Wymagane dodatkowe potwierdzenie źródeł dochodu")
-            
-        if risk_components['employment_stability'] < 0.4:
-            recommendations.append("Rozważ zabezpieczenie dodatkowe ze względu na niestabilność zatrudnienia")
-            
-        if risk_components['credit_history'] < 0.4:
-            recommendations.append("Wymagane wyjaśnienie historii kredytowej")
-            
-        if risk_components['assets'] < 0.4:
-            recommendations.append("Rozważ dodatkowe zabezpieczenie majątkowe")
-            
+        recommendations = [
+            message for component, message in RECOMMENDATIONS.items()
+            if risk_components[component] < 0.4
+        ]
         return recommendations
 
+    def assess_applications(self, applications: List[Dict[str, dict]]) -> pd.DataFrame:
+        """Ocena wielu wniosków naraz - walidacja i scoring kolumnowo.
+
+        Wyniki są identyczne ze ścieżką validate_documents + calculate_risk_score
+        wywołaną dla każdego wniosku osobno; zwracana jest jedna tabela.
+        Obie ścieżki zamieniają wartości tą samą funkcją _numeric_value, więc
+        wniosek z niepoprawną wartością (lub treścią dokumentu, która nie jest
+        słownikiem) dostaje własny wiersz błędu zamiast przerywać całą partię.
+        """
+        n = len(applications)
+        complete = np.ones(n, dtype=bool)
+        missing = [[] for _ in range(n)]
+
+        for doc_key, document in self.required_documents.items():
+            if not document.required:
+                continue
+            fields = set(REQUIRED_FIELDS[document.type])
+            for i, application in enumerate(applications):
+                content = application.get(doc_key)
+                if not _is_mapping(content) or not content.keys() >= fields:
+                    complete[i] = False
+                    missing[i].append(document.name)
+
+        rows = np.flatnonzero(complete)
+        # None - brak dokumentu; treść spoza słownika to dokument bez pól (jak w Document)
+        contents = {
+            doc_key: [_as_content(applications[i], doc_key) for i in rows.tolist()]
+            for doc_key in self.required_documents
+        }
+        invalid = {doc_key: np.zeros(len(rows), dtype=bool) for doc_key in self.required_documents}
+
+        def column(doc_key: str, field: str) -> np.ndarray:
+            values, bad = _float_column([(content or {}).get(field, 0) for content in contents[doc_key]])
+            invalid[doc_key] |= bad
+            return values
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            assets = column('financial_statement', 'assets')
+            revenue = column('financial_statement', 'revenue')
+            debt_ratio = column('financial_statement', 'liabilities') / assets
+            profit_margin = column('financial_statement', 'profit') / revenue
+            financial_stability = np.where(
+                (assets == 0) | (revenue == 0), 0.0,
+                (1 - np.minimum(debt_ratio, 1)) * 0.6 +
+                np.maximum(np.minimum(profit_margin, 1), 0) * 0.4
+            )
+
+        employment_stability = np.array([
+            _contract_score(content.get('contract_type', ''))
+            for content in contents['employment_contract']
+        ], dtype=float)
+        invalid['employment_contract'] |= np.isnan(employment_stability)
+
+        subset = {
+            'financial_stability': financial_stability,
+            'income_reliability': (
+                np.minimum(column('income_statement', 'monthly_income') / 10000, 1) * 0.7 +
+                np.minimum(column('income_statement', 'employment_period') / 60, 1) * 0.3
+            ),
+            'employment_stability': employment_stability,
+            'credit_history': (column('credit_history', 'credit_score') * 0.6 +
+                               column('credit_history', 'payment_history') * 0.4),
+            'assets': np.where(
+                np.array([content is not None for content in contents['property_valuation']], dtype=bool),
+                np.minimum(column('property_valuation', 'property_value') / 1000000, 1),
+                0.5
+            )
+        }
+
+        # Wnioski z wartościami nieliczbowymi - błąd tylko dla danego wiersza
+        for doc_key, bad in invalid.items():
+            for i in rows[bad].tolist():
+                missing[i].append(self.required_documents[doc_key].name)
+        rejected = np.zeros(n, dtype=bool)
+        rejected[rows] = np.logical_or.reduce(list(invalid.values()))
+        scored = complete & ~rejected
+
+        components = {}
+        for component, score in subset.items():
+            components[component] = np.full(n, np.nan)
+            components[component][rows] = score
+
+        # Sumowanie w tej samej kolejności co w calculate_risk_score
+        weighted_score = np.zeros(n)
+        for component, score in components.items():
+            weighted_score = weighted_score + score * self.risk_weights[component]
+
+        categories = np.array(RISK_CATEGORIES, dtype=object)[
+            np.digitize(np.nan_to_num(weighted_score), [0.2, 0.4, 0.6, 0.8])
+        ]
+
+        results = pd.DataFrame({
+            'status': np.where(scored, 'success', 'error'),
+            'overall_score': np.where(scored, weighted_score, np.nan),
+            'risk_category': np.where(scored, categories, None)
+        })
+        for component, score in components.items():
+            results[component] = np.where(scored, score, np.nan)
+
+        # Zestaw rekomendacji zakodowany bitowo - najwyżej 2^5 różnych list
+        pattern = np.zeros(n, dtype=np.int64)
+        for bit, component in enumerate(RECOMMENDATIONS):
+            pattern |= (components[component] < 0.4).astype(np.int64) << bit
+        recommendations = {
+            code: [message for bit, message in enumerate(RECOMMENDATIONS.values()) if code >> bit & 1]
+            for code in np.unique(pattern).tolist()
+        }
+        results['recommendations'] = [
+            list(recommendations[code]) if ok else None
+            for code, ok in zip(pattern.tolist(), scored.tolist())
+        ]
+        results['message'] = np.where(
+            scored, None, np.where(rejected, INVALID_VALUES_MESSAGE, 'Brak wymaganych dokumentów')
+        )
+        results['missing_documents'] = [None if scored[i] else missing[i] for i in range(n)]
+        return results
+
+
+def _numeric_value(value) -> float:
+    """Wartość pola liczbowego jako float lub NaN, gdy nie jest skończoną liczbą.
+
+    Wspólna reguła obu ścieżek oceny: tekst (także liczbowy), Decimal, bool,
+    None, NaN i nieskończoności są wartościami niepoprawnymi.
+    """
+    if type(value) is not float:
+        if isinstance(value, bool) or not isinstance(value, numbers.Real):
+            return np.nan
+        try:
+            value = float(value)
+        except OverflowError:
+            return np.nan
+    return value if math.isfinite(value) else np.nan
+
+
+def _invalid_fields(content: Mapping, fields: List[str]) -> List[str]:
+    """Obecne w treści pola liczbowe i typ umowy z niepoprawną wartością."""
+    return [
+        field for field in fields
+        if field in content and (
+            (field in _NUMERIC_FIELD_NAMES and math.isnan(_numeric_value(content[field]))) or
+            (field == 'contract_type' and math.isnan(_contract_score(content[field])))
+        )
+    ]
+
+
+def _is_mapping(content) -> bool:
+    # Szybka ścieżka dla dict - sprawdzenie względem ABC jest wielokrotnie wolniejsze
+    return type(content) is dict or isinstance(content, abc.Mapping)
+
+
+def _as_content(application: Mapping, doc_key: str) -> Optional[Mapping]:
+    if doc_key not in application:
+        return None
+    content = application[doc_key]
+    return content if _is_mapping(content) else _EMPTY_CONTENT
+
+
+def _float_column(values: List) -> Tuple[np.ndarray, np.ndarray]:
+    """Kolumna float i maska wartości niepoprawnych według _numeric_value."""
+    try:
+        # Szybka ścieżka tylko dla zwykłych liczb - pozostałe typy jak w _numeric_value
+        if not set(map(type, values)) <= _PLAIN_NUMBER_TYPES:
+            raise TypeError("Wartości wymagające sprawdzenia typu")
+        column = np.array(values, dtype=float)
+    except (TypeError, OverflowError):
+        column = np.array([_numeric_value(value) for value in values], dtype=float)
+    return column, ~np.isfinite(column)
+
+
+def _contract_score(contract_type) -> float:
+    try:
+        return CONTRACT_SCORES.get(contract_type, 0.0)
+    except TypeError:
+        # Typ niehaszowalny (np. lista) - wartość niepoprawna
+        return np.nan
+
+
 # Przykład użycia
 if __name__ == "__main__":
     # Inicjalizacja agenta
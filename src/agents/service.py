@@ -0,0 +1,456 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from agents.document_risk_agent import DOCUMENT_SCHEMA, NUMERIC_FIELDS, DocumentRiskAgent
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+           500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+_worker_agent: Optional[DocumentRiskAgent] = None
+
+
+def _init_worker() -> None:
+    global _worker_agent
+    _worker_agent = DocumentRiskAgent()
+
+
+def assess_batch(applications: List[Dict[str, dict]]) -> List[Dict]:
+    """Ocena mikro-partii w procesie roboczym - wyniki w formacie calculate_risk_score."""
+    agent = _worker_agent or DocumentRiskAgent()
+    components = list(agent.risk_weights)
+    results = []
+    for row in agent.assess_applications(applications).to_dict('records'):
+        if row['status'] == 'error':
+            results.append({
+                'status': 'error',
+                'message': row['message'],
+                'missing_documents': row['missing_documents']
+            })
+        else:
+            results.append({
+                'status': 'success',
+                'overall_score': float(row['overall_score']),
+                'risk_category': row['risk_category'],
+                'components': {component: float(row[component]) for component in components},
+                'recommendations': row['recommendations']
+            })
+    return results
+
+
+def coerce_documents(documents: Mapping) -> Dict[str, dict]:
+    """Walidacja i ujednolicenie dokumentów z żądania przed kolejkowaniem.
+
+    Zostawia tylko dokumenty ze schematu, pola liczbowe zamienia na liczby
+    (także z napisów, np. "1200.50") i zgłasza ValueError dla wartości,
+    których nie da się ocenić - taki wniosek kończy się odpowiedzią 400,
+    zamiast psuć mikro-partię pozostałych klientów.
+    """
+    coerced = {}
+    for doc_key, spec in DOCUMENT_SCHEMA.items():
+        if doc_key not in documents:
+            continue
+        content = documents[doc_key]
+        if not isinstance(content, Mapping):
+            raise ValueError(f"dokument {doc_key} musi być obiektem")
+        content = dict(content)
+
+        for field in NUMERIC_FIELDS.get(spec.type, []):
+            if field not in content:
+                continue
+            value = content[field]
+            if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+                raise ValueError(f"pole {doc_key}.{field} musi być liczbą")
+            if isinstance(value, str):
+                try:
+                    value = float(value)
+                except ValueError:
+                    raise ValueError(f"pole {doc_key}.{field} musi być liczbą") from None
+            if not math.isfinite(value):
+                raise ValueError(f"pole {doc_key}.{field} musi być liczbą skończoną")
+            content[field] = value
+
+        if spec.type == 'employment' and not isinstance(content.get('contract_type', ''), str):
+            raise ValueError(f"pole {doc_key}.contract_type musi być napisem")
+        coerced[doc_key] = content
+    return coerced
+
+
+class ServiceOverloaded(RuntimeError):
+    """Kolejka wniosków jest pełna - klient powinien ponowić żądanie później."""
+
+
+class StubDocumentSource:
+    """Lokalna atrapa wolnych systemów źródłowych dokumentów.
+
+    Dokumenty klienta zwracane są po losowym opóźnieniu z zakresu
+    `latency_ms`, co pozwala testować serwis pod realistycznym obciążeniem.
+    """
+
+    def __init__(self,
+                 documents: Dict[str, Dict[str, dict]],
+                 latency_ms: Tuple[float, float] = (20, 200),
+                 seed: int = 0):
+        self.documents = documents
+        self.latency_ms = latency_ms
+        self._rng = np.random.default_rng(seed)
+
+    async def fetch(self, client_id: str, document_ids: List[str]) -> Dict[str, dict]:
+        await asyncio.sleep(self._rng.uniform(*self.latency_ms) / 1000)
+        stored = self.documents.get(client_id, {})
+        return {doc_id: stored[doc_id] for doc_id in document_ids if doc_id in stored}
+
+
+class RiskAssessmentService:
+    """Asynchroniczny serwis HTTP oceny ryzyka dokumentów.
+
+    Wnioski trafiają do ograniczonej kolejki (pełna kolejka = 503), skąd
+    zbierane są w mikro-partie po `batch_size` wniosków lub `batch_timeout_ms`
+    milisekund i oceniane wsadowo w puli procesów. Liczba partii w toku
+    jest ograniczona, więc przy przeciążeniu rośnie kolejka, a nie pamięć.
+    """
+
+    def __init__(self,
+                 document_source: Optional[StubDocumentSource] = None,
+                 max_workers: Optional[int] = None,
+                 batch_size: int = 32,
+                 batch_timeout_ms: float = 10,
+                 max_pending: int = 1000,
+                 max_inflight_batches: Optional[int] = None,
+                 latency_window: int = 10000,
+                 max_stored_results: int = 10000):
+        self.document_source = document_source
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout_ms / 1000
+        self.max_pending = max_pending
+        self.max_inflight_batches = max_inflight_batches or 2 * self.max_workers
+        self.max_stored_results = max_stored_results
+
+        self._latencies: deque = deque(maxlen=latency_window)
+        self._counts: Counter = Counter()
+        self._results: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._batch_tasks: set = set()
+        self._connections: Dict[asyncio.StreamWriter, asyncio.Task] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._batcher: Optional[asyncio.Task] = None
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8080) -> asyncio.AbstractServer:
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._inflight = asyncio.Semaphore(self.max_inflight_batches)
+        self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker)
+        self._batcher = asyncio.create_task(self._batch_loop())
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server
+
+    async def close(self) -> None:
+        self._server.close()
+        # Zamknięcie połączeń keep-alive i zaczekanie na zakończenie ich obsługi
+        for writer in list(self._connections):
+            writer.close()
+        await asyncio.gather(*self._connections.values(), return_exceptions=True)
+        await self._server.wait_closed()
+        self._batcher.cancel()
+        if self._batch_tasks:
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
+        self._pool.shutdown(wait=True)
+
+    async def assess(self, documents: Dict[str, dict]) -> Dict:
+        """Ocena jednego wniosku przez kolejkę mikro-partii."""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((documents, future))
+        except asyncio.QueueFull:
+            raise ServiceOverloaded("Przekroczono limit oczekujących wniosków")
+        return await future
+
+    async def _batch_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._inflight.acquire()
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_timeout
+
+            while len(batch) < self.batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            task = asyncio.create_task(self._run_batch(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[Dict, asyncio.Future]]) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            try:
+                results = await loop.run_in_executor(
+                    self._pool, assess_batch, [documents for documents, _ in batch]
+                )
+            except Exception:
+                # Ponowienie pojedynczo - błąd trafia tylko do wniosku, który go wywołał
+                self._counts['batch_retries'] += 1
+                results = await asyncio.gather(
+                    *(loop.run_in_executor(self._pool, assess_batch, [documents])
+                      for documents, _ in batch),
+                    return_exceptions=True
+                )
+                results = [result if isinstance(result, BaseException) else result[0]
+                           for result in results]
+
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        except Exception as error:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+        finally:
+            self._counts['batches'] += 1
+            self._counts['batched_applications'] += len(batch)
+            self._inflight.release()
+
+    async def _resolve_documents(self, client_id: str, documents) -> Dict[str, dict]:
+        """Dokumenty przekazane wprost lub identyfikatory do pobrania ze źródła."""
+        if isinstance(documents, dict):
+            return documents
+
+        resolved, to_fetch = {}, []
+        for document in documents:
+            if isinstance(document, str):
+                to_fetch.append(document)
+            else:
+                resolved[document['type']] = document['content']
+
+        if to_fetch and self.document_source is not None:
+            resolved.update(await self.document_source.fetch(client_id, to_fetch))
+        return resolved
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[int, Dict]:
+        if method == 'POST' and path == '/api/v1/risk-assessment':
+            return await self._risk_assessment(body)
+        if method == 'GET' and path.startswith('/api/v1/recommendations/'):
+            client_id = path[len('/api/v1/recommendations/'):]
+            if client_id not in self._results:
+                return 404, {'error': f"Brak oceny dla klienta: {client_id}"}
+            result = self._results[client_id]
+            return 200, {'client_id': client_id,
+                         'risk_category': result.get('risk_category'),
+                         'recommendations': result.get('recommendations', [])}
+        if method == 'GET' and path == '/api/v1/metrics':
+            return 200, self.metrics()
+        return 404, {'error': 'Nieznany zasób'}
+
+    async def _risk_assessment(self, body: bytes) -> Tuple[int, Dict]:
+        start = time.perf_counter()
+        self._counts['requests'] += 1
+        try:
+            request = json.loads(body)
+            client_id = str(request['client_id'])
+            documents = request['documents']
+            if not isinstance(documents, (dict, list)):
+                raise TypeError("documents musi być listą lub słownikiem")
+            documents = coerce_documents(await self._resolve_documents(client_id, documents))
+        except (ValueError, KeyError, TypeError) as error:
+            self._counts['bad_requests'] += 1
+            return 400, {'error': f"Niepoprawne żądanie: {error}"}
+
+        try:
+            result = await self.assess(documents)
+        except ServiceOverloaded as error:
+            self._counts['rejected'] += 1
+            return 503, {'error': str(error)}
+
+        self._results[client_id] = result
+        self._results.move_to_end(client_id)
+        if len(self._results) > self.max_stored_results:
+            self._results.popitem(last=False)
+
+        self._latencies.append(time.perf_counter() - start)
+        return 200, {'client_id': client_id, **result}
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                try:
+                    status, payload = await self._route(method, path, body)
+                except Exception as error:
+                    # Nieoczekiwany błąd - odpowiedź 500 zamiast zerwanego połączenia
+                    self._counts['errors'] += 1
+                    status, payload = 500, {'error': f"Błąd wewnętrzny serwisu: {type(error).__name__}"}
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                        f"Content-Type: application/json; charset=utf-8\r\n"
+                        f"Content-Length: {len(data)}\r\n"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n")
+                if status == 503:
+                    head += "Retry-After: 1\r\n"
+                writer.write(head.encode('latin-1') + b"\r\n" + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self._connections.pop(writer, None)
+            writer.close()
+
+    def metrics(self) -> Dict:
+        """Liczniki serwisu i percentyle opóźnień (ms) z ostatnich żądań."""
+        latencies = np.asarray(self._latencies) * 1000
+        percentiles = (np.percentile(latencies, [50, 95, 99]) if len(latencies)
+                       else np.full(3, np.nan))
+        return {
+            'requests': self._counts['requests'],
+            'rejected': self._counts['rejected'],
+            'bad_requests': self._counts['bad_requests'],
+            'errors': self._counts['errors'],
+            'batch_retries': self._counts['batch_retries'],
+            'batches': self._counts['batches'],
+            'mean_batch_size': (self._counts['batched_applications'] / self._counts['batches']
+                                if self._counts['batches'] else 0.0),
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'latency_ms': {
+                'p50': float(percentiles[0]),
+                'p95': float(percentiles[1]),
+                'p99': float(percentiles[2]),
+                'max': float(latencies.max()) if len(latencies) else float('nan')
+            }
+        }
+
+
+async def _post(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                path: str, payload: Dict) -> Tuple[int, Dict]:
+    body = json.dumps(payload).encode('utf-8')
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: localhost\r\n"
+                 f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+                 .encode('latin-1') + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def load_test(host: str,
+                    port: int,
+                    requests: List[Dict],
+                    concurrency: int = 64) -> Dict:
+    """Generator obciążenia - `concurrency` połączeń keep-alive wysyła żądania równolegle."""
+    pending = deque(requests)
+    latencies, statuses = [], Counter()
+
+    async def client() -> None:
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while pending:
+                payload = pending.popleft()
+                start = time.perf_counter()
+                status, _ = await _post(reader, writer, '/api/v1/risk-assessment', payload)
+                latencies.append(time.perf_counter() - start)
+                statuses[status] += 1
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    p50, p95, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 95, 99])
+    return {
+        'requests_per_s': len(latencies) / elapsed,
+        'statuses': dict(statuses),
+        'latency_ms': {'p50': float(p50), 'p95': float(p95), 'p99': float(p99)}
+    }
+
+
+async def _run_load_test(n_requests: int, concurrency: int) -> None:
+    from agents.benchmark import random_application
+
+    rng = np.random.default_rng(0)
+    clients = {f"client-{i}": random_application(rng) for i in range(n_requests)}
+    service = RiskAssessmentService(document_source=StubDocumentSource(clients))
+    server = await service.start(port=0)
+    port = server.sockets[0].getsockname()[1]
+
+    # Połowa wniosków z dokumentami w treści, połowa pobierana ze źródła
+    requests = [
+        {'client_id': client_id,
+         'documents': list(documents) if i % 2 else
+                      [{'type': key, 'content': content} for key, content in documents.items()],
+         'loan_params': {'amount': 100000, 'term': 36}}
+        for i, (client_id, documents) in enumerate(clients.items())
+    ]
+    try:
+        print("Klient:", await load_test('127.0.0.1', port, requests, concurrency))
+        print("Serwis:", service.metrics())
+    finally:
+        await service.close()
+
+
+async def _serve(host: str, port: int) -> None:
+    service = RiskAssessmentService()
+    server = await service.start(host, port)
+    async with server:
+        await server.serve_forever()
+
+
+# Uruchomienie serwisu lub testu obciążeniowego
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serwis oceny ryzyka dokumentów")
+    parser.add_argument('--serve', action='store_true', help="uruchom serwis zamiast testu obciążeniowego")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    args = parser.parse_args()
+
+    if args.serve:
+        asyncio.run(_serve(args.host, args.port))
+    else:
+        asyncio.run(_run_load_test(args.requests, args.concurrency))
@@ -0,0 +1,33 @@
+import pandas as pd
+from typing import Iterator, List, Optional, Union
+
+
+def read_portfolio_chunks(source: Union[str, object],
+                          chunk_size: int = 100_000,
+                          columns: Optional[List[str]] = None,
+                          query: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """Odczyt portfela porcjami z pliku Parquet/CSV lub zapytania SQL.
+
+    Dla SQL `source` to URL bazy lub obiekt sqlalchemy Engine, a `query`
+    zapytanie zwracające portfel.
+    """
+    if query is not None:
+        from sqlalchemy import create_engine, text
+
+        engine = create_engine(source) if isinstance(source, str) else source
+        with engine.connect() as connection:
+            for chunk in pd.read_sql(text(query), connection, chunksize=chunk_size):
+                yield chunk[columns] if columns else chunk
+
+    elif str(source).endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Odczyt plików Parquet wymaga pakietu pyarrow")
+
+        parquet_file = pq.ParquetFile(source)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+
+    else:
+        yield from pd.read_csv(source, chunksize=chunk_size, usecols=columns)
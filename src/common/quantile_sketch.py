@@ -0,0 +1,67 @@
+import numpy as np
+from typing import Union
+
+ArrayLike = Union[float, np.ndarray]
+
+
+class QuantileSketch:
+    """Mergowalny szkic kwantyli oparty na histogramie o stałym zakresie.
+
+    Jeden obiekt obsługuje wiele niezależnych strumieni (np. jeden na dług),
+    każdy z własnym zakresem [lower, upper]. Wartości spoza zakresu trafiają
+    do skrajnych przedziałów. Błąd kwantyla jest ograniczony szerokością
+    przedziału, a pamięć liczbą strumieni i przedziałów - nie liczbą obserwacji.
+    """
+
+    def __init__(self, lower: ArrayLike, upper: ArrayLike, bins: int = 512):
+        self.lower = np.atleast_1d(np.asarray(lower, dtype=float))
+        self.upper = np.broadcast_to(np.asarray(upper, dtype=float), self.lower.shape).copy()
+        self.bins = bins
+        width = self.upper - self.lower
+        self.width = np.where(width > 0, width, 1.0)
+        self.counts = np.zeros((len(self.lower), bins), dtype=np.int64)
+
+    @property
+    def n_streams(self) -> int:
+        return len(self.lower)
+
+    @property
+    def total(self) -> np.ndarray:
+        """Liczba obserwacji w każdym strumieniu."""
+        return self.counts.sum(axis=1)
+
+    def update(self, values: np.ndarray) -> None:
+        """Dodanie obserwacji - macierz (strumienie × obserwacje) lub wektor dla jednego strumienia."""
+        values = np.asarray(values, dtype=float)
+        if values.ndim == 1:
+            values = values.reshape(self.n_streams, -1)
+
+        positions = (values - self.lower[:, None]) / self.width[:, None] * self.bins
+        bin_index = np.clip(positions.astype(np.int64), 0, self.bins - 1)
+        flat_index = bin_index + (np.arange(self.n_streams) * self.bins)[:, None]
+
+        self.counts += np.bincount(
+            flat_index.ravel(), minlength=self.n_streams * self.bins
+        ).reshape(self.n_streams, self.bins)
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        """Scalenie z innym szkicem o identycznych zakresach."""
+        if (self.bins != other.bins or not np.array_equal(self.lower, other.lower)
+                or not np.array_equal(self.upper, other.upper)):
+            raise ValueError("Nie można scalić szkiców o różnych zakresach")
+        self.counts += other.counts
+        return self
+
+    def quantile(self, q: float) -> np.ndarray:
+        """Przybliżony kwantyl q (0-1) dla każdego strumienia."""
+        cumulative = self.counts.cumsum(axis=1)
+        target = q * cumulative[:, -1]
+
+        bin_index = np.argmax(cumulative >= target[:, None], axis=1)
+        rows = np.arange(self.n_streams)
+        previous = np.where(bin_index > 0, cumulative[rows, bin_index - 1], 0)
+        in_bin = self.counts[rows, bin_index]
+        fraction = np.where(in_bin > 0, (target - previous) / np.maximum(in_bin, 1), 0.0)
+
+        result = self.lower + (bin_index + fraction) / self.bins * self.width
+        return np.where(cumulative[:, -1] > 0, result, np.nan)
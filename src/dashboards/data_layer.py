@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, Optional
+
+from dashboards.incremental import IncrementalAggregateStore
+from repayment_models.batch_forecasting import MIN_ARIMA_OBSERVATIONS, arima_forecast, random_walk_forecast
+from repayment_models.repayment_predictor import RepaymentPredictor
+from risk_analysis.credit_scoring import CreditScoring
+
+# Czas ważności agregatów w sekundach (zmienna CACHE_TIMEOUT z pliku .env)
+CACHE_TIMEOUT = int(os.environ.get('CACHE_TIMEOUT', 3600))
+
+
+def sample_portfolio(n_cases: int = 5000, n_months: int = 24, seed: int = 0):
+    """Przykładowy portfel (z gotowym score'em) i księga spłat do prezentacji dashboardu."""
+    rng = np.random.default_rng(seed)
+    portfolio = pd.DataFrame({
+        'debtor_id': np.arange(n_cases),
+        'amount': rng.lognormal(9, 0.8, n_cases).round(2),
+        'risk_score': rng.beta(2, 3, n_cases)
+    })
+
+    n_payments = n_cases * 4
+    debtors = rng.integers(0, n_cases, n_payments)
+    start = np.datetime64('2023-01-01')
+    payments = pd.DataFrame({
+        'debtor_id': debtors,
+        'date': start + rng.integers(0, n_months * 30, n_payments).astype('timedelta64[D]'),
+        'payment_amount': (portfolio['amount'].to_numpy()[debtors] * rng.uniform(0.01, 0.08, n_payments)
+                           * (1 - portfolio['risk_score'].to_numpy()[debtors])).round(2)
+    })
+    return portfolio, payments
+
+
+class DashboardDataLayer:
+    """Warstwa danych dashboardu - zagregowane tabele KPI liczone po stronie serwera.
+
+    Portfel oceniany jest raz przez CreditScoring, trend spłat liczony raz
+    przez RepaymentPredictor, a wynik przechowywany przez `cache_timeout`
+    sekund. Równoczesne żądania po wygaśnięciu czekają na jedno przeliczenie
+    zamiast liczyć portfel każde osobno. Do przeglądarki trafiają wyłącznie
+    agregaty.
+
+    Między pełnymi przeliczeniami nowe score'y i spłaty (`add_cases`,
+    `add_payments`) aktualizują przyrostowy magazyn agregatów `live`.
+    """
+
+    def __init__(self,
+                 load_portfolio: Callable[[], pd.DataFrame],
+                 load_payments: Callable[[], pd.DataFrame],
+                 scoring: Optional[CreditScoring] = None,
+                 predictor: Optional[RepaymentPredictor] = None,
+                 cache_timeout: float = CACHE_TIMEOUT,
+                 debtor_column: str = 'debtor_id',
+                 forecast_periods: int = 12):
+        self.load_portfolio = load_portfolio
+        self.load_payments = load_payments
+        # Bez modelu score'y brane są z kolumny risk_score portfela
+        self.scoring = scoring or CreditScoring()
+        self.use_model = scoring is not None
+        self.predictor = predictor or RepaymentPredictor()
+        self.cache_timeout = cache_timeout
+        self.debtor_column = debtor_column
+        self.forecast_periods = forecast_periods
+
+        self._lock = threading.Lock()
+        self._aggregates: Optional[Dict] = None
+        self._expires_at = 0.0
+        self.version = 0
+
+    @classmethod
+    def sample(cls, **kwargs) -> 'DashboardDataLayer':
+        """Warstwa danych na przykładowym portfelu."""
+        portfolio, payments = sample_portfolio()
+        return cls(lambda: portfolio, lambda: payments, **kwargs)
+
+    def aggregates(self) -> Dict:
+        """Aktualne agregaty - z bufora lub przeliczone, gdy bufor wygasł."""
+        with self._lock:
+            if self._aggregates is None or time.time() >= self._expires_at:
+                self._aggregates = self.compute_aggregates()
+                self._expires_at = time.time() + self.cache_timeout
+                self.version += 1
+                self._aggregates['version'] = self.version
+            return self._aggregates
+
+    def invalidate(self) -> None:
+        """Wymuszenie przeliczenia przy następnym odczycie (np. po imporcie danych)."""
+        with self._lock:
+            self._expires_at = 0.0
+
+    def compute_aggregates(self) -> Dict:
+        """Pełne przeliczenie tabel KPI na podstawie portfela i księgi spłat."""
+        portfolio = self.load_portfolio()
+        payments = self.load_payments()
+
+        live = IncrementalAggregateStore(self.scoring.categorize_scores,
+                                         len(self.scoring.risk_categories))
+        live.add_cases(portfolio[self.debtor_column], self._scores(portfolio), portfolio['amount'])
+        live.add_payments(payments[self.debtor_column], payments['date'], payments['payment_amount'])
+
+        trend = self.predictor.prepare_time_series(payments)
+
+        return {
+            'computed_at': pd.Timestamp.now().isoformat(timespec='seconds'),
+            'live': live,
+            'trend_spłat': trend,
+            'prognoza_odzysków': self._forecast_recoveries(trend)
+        }
+
+    def _scores(self, cases: pd.DataFrame) -> np.ndarray:
+        if self.use_model:
+            return self.scoring.predict_risk_score(self.scoring.prepare_features(cases))
+        return cases['risk_score'].to_numpy(dtype=float)
+
+    @property
+    def live(self) -> IncrementalAggregateStore:
+        return self.aggregates()['live']
+
+    def add_cases(self, cases: pd.DataFrame) -> int:
+        """Nowe lub ponownie ocenione sprawy w ciągu dnia - aktualizacja O(liczba spraw)."""
+        return self.live.add_cases(cases[self.debtor_column], self._scores(cases), cases['amount'])
+
+    def add_payments(self, payments: pd.DataFrame) -> int:
+        """Nowe spłaty w ciągu dnia - aktualizacja O(liczba spłat)."""
+        return self.live.add_payments(payments[self.debtor_column], payments['date'],
+                                      payments['payment_amount'])
+
+    def kpi(self) -> Dict:
+        return self.live.kpi()
+
+    def category_table(self) -> pd.DataFrame:
+        """Liczności, wartości i odzyski per kategoria ryzyka."""
+        return self.live.category_table(self.scoring.risk_categories)
+
+    def _forecast_recoveries(self, trend: pd.Series) -> pd.DataFrame:
+        """Prognoza miesięcznych spłat; dla krótkich szeregów błądzenie losowe z dryfem."""
+        values = trend.to_numpy(dtype=float)
+        try:
+            if len(values) < MIN_ARIMA_OBSERVATIONS:
+                raise ValueError("Za krótki szereg dla ARIMA")
+            forecast, lower, upper = arima_forecast(values, self.forecast_periods)
+        except (ValueError, np.linalg.LinAlgError):
+            forecast, lower, upper = (bound[0] for bound in random_walk_forecast(values, self.forecast_periods))
+
+        dates = pd.date_range(trend.index[-1], periods=self.forecast_periods + 1, freq='M')[1:]
+        return pd.DataFrame({
+            'prognoza': forecast,
+            'dolna_granica': lower,
+            'górna_granica': upper
+        }, index=pd.Index(dates, name='date'))
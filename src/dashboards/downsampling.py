@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+from typing import Optional, Tuple
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indeksy punktów wybranych algorytmem Largest-Triangle-Three-Buckets.
+
+    Zachowuje kształt szeregu (szczyty i doliny) przy `n_out` punktach;
+    pierwszy i ostatni punkt są zawsze zachowane. `x` musi być rosnące.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # Granice n_out - 2 wewnętrznych koszyków
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start = edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        average_x = x[next_start:next_end].mean()
+        average_y = y[next_start:next_end].mean()
+
+        area = np.abs((x[previous] - average_x) * (y[start:end] - y[previous]) -
+                      (x[previous] - x[start:end]) * (average_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+def minmax_indices(x: np.ndarray, y: np.ndarray, n_buckets: int) -> np.ndarray:
+    """Indeksy minimum i maksimum w każdym z `n_buckets` równych przedziałów osi x.
+
+    Przy jednym koszyku na piksel wykres wygląda identycznie jak pełny szereg.
+    """
+    n = len(y)
+    if 2 * n_buckets >= n:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    span = x[-1] - x[0]
+    buckets = (((x - x[0]) / span * n_buckets).astype(np.int64).clip(max=n_buckets - 1)
+               if span > 0 else np.zeros(n, dtype=np.int64))
+
+    # x jest rosnące, więc koszyki tworzą ciągłe przedziały indeksów
+    starts = np.flatnonzero(np.r_[True, np.diff(buckets) != 0])
+    counts = np.diff(np.r_[starts, n])
+    y = np.asarray(y, dtype=float)
+
+    selected = [0, n - 1]
+    for extreme in (np.minimum.reduceat(y, starts), np.maximum.reduceat(y, starts)):
+        hits = np.flatnonzero(y == np.repeat(extreme, counts))
+        # Pierwsze trafienie w każdym koszyku
+        hit_buckets = buckets[hits]
+        selected.append(hits[np.r_[True, np.diff(hit_buckets) != 0]])
+    return np.unique(np.concatenate([np.atleast_1d(part) for part in selected]))
+
+
+def series_to_epoch_ms(series: pd.Series) -> np.ndarray:
+    """Indeks czasowy szeregu jako milisekundy epoki (float64) dla osi 'date' w Plotly."""
+    return series.index.to_numpy().astype('datetime64[ms]').astype(np.int64).astype(float)
+
+
+def downsample_series(series: pd.Series,
+                      max_points: int = 2000,
+                      start: Optional[pd.Timestamp] = None,
+                      end: Optional[pd.Timestamp] = None,
+                      method: str = 'lttb') -> Tuple[np.ndarray, np.ndarray]:
+    """Wycinek szeregu czasowego zredukowany do najwyżej `max_points` punktów.
+
+    Zwraca czas w milisekundach epoki (oś typu 'date' w Plotly) i wartości
+    jako tablice float64; rozmiar ładunku ogranicza `max_points`.
+    Wycinek obejmuje po jednym punkcie poza oknem z każdej strony, aby linia
+    nie urywała się na krawędziach wykresu.
+    """
+    index = series.index
+    lo = 0 if start is None else max(index.searchsorted(start) - 1, 0)
+    hi = len(series) if end is None else min(index.searchsorted(end, side='right') + 1, len(series))
+
+    x = series_to_epoch_ms(series.iloc[lo:hi])
+    y = series.to_numpy(dtype=float)[lo:hi]
+
+    if method == 'minmax':
+        keep = minmax_indices(x, y, max_points // 2)
+    else:
+        keep = lttb_indices(x, y, max_points)
+    return x[keep], y[keep]
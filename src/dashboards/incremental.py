@@ -0,0 +1,194 @@
+import threading
+from collections import deque
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, Iterable, Optional, Set
+
+# Części dashboardu, które może zmienić porcja danych
+PARTS = frozenset({'kpi', 'categories', 'daily'})
+
+
+class IncrementalAggregateStore:
+    """Przyrostowe agregaty portfela aktualizowane porcjami (delta) w ciągu dnia.
+
+    Liczności i sumy per kategoria, suma score'ów, liczba aktywnych spraw
+    i dzienne sumy spłat aktualizowane są kosztem O(rozmiar porcji).
+    Każda porcja zwiększa `seq` i trafia do dziennika zmian, z którego
+    dashboard odczytuje, które części wymagają odświeżenia.
+    """
+
+    def __init__(self,
+                 categorize: Callable[[np.ndarray], np.ndarray],
+                 n_categories: int,
+                 log_size: int = 1000):
+        self.categorize = categorize
+        self.n_categories = n_categories
+
+        self._positions: Dict = {}
+        self._codes = np.empty(0, dtype=np.int64)
+        self._scores = np.empty(0)
+        self._amounts = np.empty(0)
+        self._recovered = np.empty(0)
+        self.n_cases = 0
+
+        self.category_counts = np.zeros(n_categories, dtype=np.int64)
+        self.category_values = np.zeros(n_categories)
+        self.category_recovered = np.zeros(n_categories)
+        self.score_sum = 0.0
+        self.total_value = 0.0
+        self.total_recovered = 0.0
+        self.active_cases = 0
+        # Dzienne sumy wszystkich spłat: numer dnia od 1970-01-01 -> kwota
+        self.daily: Dict[int, float] = {}
+
+        self.seq = 0
+        self._log: deque = deque(maxlen=log_size)
+        self._lock = threading.Lock()
+
+    def _grow(self, n_cases: int) -> None:
+        capacity = len(self._codes)
+        if n_cases <= capacity:
+            return
+        capacity = max(n_cases, 2 * capacity, 1024)
+        for name in ('_codes', '_scores', '_amounts', '_recovered'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _lookup(self, debtor_ids: Iterable) -> np.ndarray:
+        return np.array([self._positions.get(debtor, -1) for debtor in debtor_ids], dtype=np.int64)
+
+    def _contribute(self, positions: np.ndarray, sign: int) -> None:
+        """Dodanie (sign=1) lub odjęcie (sign=-1) wkładu spraw do agregatów."""
+        codes = self._codes[positions]
+        amounts = self._amounts[positions]
+        recovered = self._recovered[positions]
+        self.category_counts += sign * np.bincount(codes, minlength=self.n_categories)
+        self.category_values += sign * np.bincount(codes, weights=amounts, minlength=self.n_categories)
+        self.category_recovered += sign * np.bincount(codes, weights=recovered, minlength=self.n_categories)
+        self.score_sum += sign * float(self._scores[positions].sum())
+        self.total_value += sign * float(amounts.sum())
+        self.active_cases += sign * int(np.sum(recovered < amounts))
+
+    def _record(self, parts: Set[str]) -> int:
+        self.seq += 1
+        self._log.append((self.seq, frozenset(parts)))
+        return self.seq
+
+    def add_cases(self, debtor_ids: Iterable, scores: np.ndarray, amounts: np.ndarray) -> int:
+        """Nowe lub ponownie ocenione sprawy (identyfikatory unikalne w porcji)."""
+        debtor_ids = list(debtor_ids)
+        scores = np.asarray(scores, dtype=float)
+        amounts = np.asarray(amounts, dtype=float)
+
+        with self._lock:
+            positions = self._lookup(debtor_ids)
+            # Ponownie ocenione sprawy - najpierw wycofanie poprzedniego wkładu
+            self._contribute(positions[positions >= 0], -1)
+
+            new = np.flatnonzero(positions < 0)
+            positions[new] = self.n_cases + np.arange(len(new))
+            for i in new:
+                self._positions[debtor_ids[i]] = positions[i]
+            self.n_cases += len(new)
+            self._grow(self.n_cases)
+
+            self._codes[positions] = self.categorize(scores)
+            self._scores[positions] = scores
+            self._amounts[positions] = amounts
+            self._contribute(positions, 1)
+            return self._record({'kpi', 'categories'})
+
+    def add_payments(self, debtor_ids: Iterable, dates, amounts: np.ndarray) -> int:
+        """Nowe spłaty; spłaty nieznanych dłużników liczą się tylko do sum dziennych."""
+        amounts = np.asarray(amounts, dtype=float)
+        days = pd.to_datetime(dates).to_numpy().astype('datetime64[D]').astype(np.int64)
+
+        with self._lock:
+            positions = self._lookup(debtor_ids)
+            known = positions >= 0
+            touched = np.unique(positions[known])
+
+            self._contribute(touched, -1)
+            np.add.at(self._recovered, positions[known], amounts[known])
+            self._contribute(touched, 1)
+            self.total_recovered += float(amounts[known].sum())
+
+            unique_days, inverse = np.unique(days, return_inverse=True)
+            for day, total in zip(unique_days.tolist(), np.bincount(inverse, weights=amounts).tolist()):
+                self.daily[day] = self.daily.get(day, 0.0) + total
+
+            parts = {'daily'}
+            if len(touched):
+                parts.add('kpi')
+            return self._record(parts)
+
+    def changes_since(self, seq: int) -> Set[str]:
+        """Części zmienione po `seq`; przy zbyt starym `seq` wszystkie części."""
+        with self._lock:
+            if seq >= self.seq:
+                return set()
+            if not self._log or self._log[0][0] > seq + 1:
+                return set(PARTS)
+            changed: Set[str] = set()
+            for entry_seq, parts in self._log:
+                if entry_seq > seq:
+                    changed |= parts
+            return changed
+
+    def kpi(self) -> Dict:
+        """Wskaźniki portfela - koszt O(1)."""
+        return {
+            'Całkowita wartość portfela': self.total_value,
+            'Średni score ryzyka': self.score_sum / self.n_cases if self.n_cases else 0.0,
+            'Wskaźnik odzysku': self.total_recovered / self.total_value if self.total_value else 0.0,
+            'Aktywne sprawy': self.active_cases
+        }
+
+    def category_table(self, categories: Iterable[str]) -> pd.DataFrame:
+        """Liczności, wartości i odzyski per kategoria ryzyka."""
+        table = pd.DataFrame({
+            'liczba_spraw': self.category_counts.copy(),
+            'wartość': self.category_values.copy(),
+            'odzyskano': self.category_recovered.copy()
+        }, index=pd.Index(list(categories), name='kategoria'))
+        table['wskaźnik_odzysku'] = (table['odzyskano'] /
+                                     table['wartość'].replace(0, np.nan)).fillna(0)
+        return table
+
+    def _daily_arrays(self):
+        with self._lock:
+            days = np.fromiter(self.daily.keys(), dtype=np.int64, count=len(self.daily))
+            values = np.fromiter(self.daily.values(), dtype=float, count=len(self.daily))
+        return days, values
+
+    def daily_series(self, since: Optional[pd.Timestamp] = None) -> pd.Series:
+        """Dzienne sumy spłat (od dnia `since` włącznie) z dniami bez spłat jako 0."""
+        return self._daily(*self._daily_arrays(), since)
+
+    def cumulative_recovery(self, since: Optional[pd.Timestamp] = None) -> pd.Series:
+        """Skumulowane spłaty jako część wartości portfela (od dnia `since`)."""
+        days, values = self._daily_arrays()
+        daily = self._daily(days, values, since)
+        if not self.total_value:
+            return daily * 0
+
+        before = 0.0 if since is None else values[days < _day_number(since)].sum()
+        return (before + daily.cumsum()) / self.total_value
+
+    @staticmethod
+    def _daily(days: np.ndarray, values: np.ndarray, since: Optional[pd.Timestamp]) -> pd.Series:
+        if not len(days):
+            return pd.Series(dtype=float, index=pd.DatetimeIndex([], name='date'), name='payment_amount')
+
+        first = days.min() if since is None else _day_number(since)
+        mask = days >= first
+        totals = np.bincount(days[mask] - first, weights=values[mask],
+                             minlength=max(int(days.max() - first) + 1, 0))
+        index = pd.DatetimeIndex((first + np.arange(len(totals))).astype('datetime64[D]'), name='date')
+        return pd.Series(totals, index=index, name='payment_amount')
+
+
+def _day_number(date) -> int:
+    return int(np.datetime64(pd.Timestamp(date), 'D').astype(np.int64))
@@ -1,21 +1,42 @@
 import dash
-from dash import html, dcc
+from dash import html, dcc, Patch, no_update
 import dash_bootstrap_components as dbc
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
+from typing import Callable, Dict, Optional, Tuple
+
+from dashboards.data_layer import DashboardDataLayer
+from dashboards.downsampling import downsample_series, series_to_epoch_ms
 
 class RiskDashboard:
-    def __init__(self):
+    def __init__(self, data_layer: Optional[DashboardDataLayer] = None):
         self.app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+        # Bez wskazanego źródła dashboard pokazuje przykładowy portfel
+        self.data_layer = data_layer or DashboardDataLayer.sample()
+        self._figures: Dict[str, tuple] = {}
+        # Limit punktów na serię wysyłaną do przeglądarki (ok. 1 punkt na piksel)
+        self.max_points = 2000
+        # Okres odpytywania o przyrostowe zmiany agregatów (ms)
+        self.refresh_interval_ms = 5000
         self.setup_layout()
         self.setup_callbacks()
 
     def setup_layout(self):
         """Konfiguracja układu dashboardu."""
-        self.app.layout = dbc.Container([
+        # Układ budowany przy każdym otwarciu strony - magazyn dostaje bieżącą wersję agregatów
+        self.app.layout = self.serve_layout
+
+    def serve_layout(self):
+        """Układ dashboardu; w przeglądarce trafia tylko numer wersji agregatów."""
+        return dbc.Container([
+            dcc.Store(id="portfolio-data-store", data=self._store_data()),
+            dcc.Store(id="live-update-store", data=self._live_state()),
+            dcc.Interval(id="live-update-interval", interval=self.refresh_interval_ms),
+
             dbc.Row([
                 dbc.Col(html.H1("Dashboard Analizy Ryzyka", className="text-center mb-4"), width=12)
             ]),
@@ -80,13 +101,7 @@ class RiskDashboard:
             Input("portfolio-data-store", "data")
         )
         def update_metrics(data):
-            # Przykładowe dane
-            metrics = {
-                "Całkowita wartość portfela": "1,000,000 PLN",
-                "Średni score ryzyka": "0.45",
-                "Wskaźnik odzysku": "35%",
-                "Aktywne sprawy": "1,250"
-            }
+            metrics = self._format_kpi(self.data_layer.kpi())
             
             return [
                 html.Div([
@@ -101,44 +116,257 @@ class RiskDashboard:
             Input("portfolio-data-store", "data")
         )
         def update_risk_distribution(data):
-            # Przykładowe dane
-            categories = ["Niskie", "Średnio-niskie", "Średnie", "Średnio-wysokie", "Wysokie"]
-            values = [20, 35, 25, 15, 5]
-            
-            fig = go.Figure(data=[
-                go.Bar(x=categories, y=values, marker_color='rgb(55, 83, 109)')
-            ])
-            
-            fig.update_layout(
-                title="Rozkład Kategorii Ryzyka",
-                xaxis_title="Kategoria Ryzyka",
-                yaxis_title="Liczba Przypadków",
-                showlegend=False
-            )
-            
-            return fig
+            return self._risk_distribution_figure()
 
         @self.app.callback(
             Output("repayment-trend", "figure"),
+            Input("portfolio-data-store", "data"),
+            Input("repayment-trend", "relayoutData")
+        )
+        def update_repayment_trend(data, relayout):
+            return self._zoomable_figure("repayment-trend", relayout)
+
+        @self.app.callback(
+            Output("recovery-analysis", "figure"),
+            Input("portfolio-data-store", "data"),
+            Input("recovery-analysis", "relayoutData")
+        )
+        def update_recovery_analysis(data, relayout):
+            return self._zoomable_figure("recovery-analysis", relayout)
+
+        @self.app.callback(
+            Output("recovery-forecast", "figure"),
             Input("portfolio-data-store", "data")
         )
-        def update_repayment_trend(data):
-            # Przykładowe dane
-            dates = pd.date_range(start='2023-01-01', periods=12, freq='M')
-            values = np.cumsum(np.random.normal(1000, 100, 12))
-            
-            fig = px.line(
-                x=dates, 
-                y=values,
-                title="Trend Spłat w Czasie"
-            )
-            
-            fig.update_layout(
-                xaxis_title="Data",
+        def update_recovery_forecast(data):
+            return self._cached_figure("recovery-forecast", self._recovery_forecast_figure)
+
+        @self.app.callback(
+            Output("portfolio-metrics", "children", allow_duplicate=True),
+            Output("risk-distribution", "figure", allow_duplicate=True),
+            Output("repayment-trend", "figure", allow_duplicate=True),
+            Output("recovery-analysis", "figure", allow_duplicate=True),
+            Output("live-update-store", "data"),
+            Output("portfolio-data-store", "data"),
+            Input("live-update-interval", "n_intervals"),
+            State("live-update-store", "data"),
+            State("recovery-analysis", "relayoutData"),
+            prevent_initial_call=True
+        )
+        def push_live_updates(n_intervals, state, recovery_relayout):
+            return self._live_updates(state, recovery_relayout)
+
+    def _store_data(self) -> Dict:
+        aggregates = self.data_layer.aggregates()
+        return {'version': aggregates['version'], 'computed_at': aggregates['computed_at']}
+
+    def _live_state(self) -> Dict:
+        aggregates = self.data_layer.aggregates()
+        return {'version': aggregates['version'], 'seq': aggregates['live'].seq}
+
+    def _live_updates(self, state: Dict, recovery_relayout: Optional[Dict] = None) -> tuple:
+        """Częściowe aktualizacje (Patch) tylko dla części zmienionych od `seq` klienta.
+
+        Po pełnym przeliczeniu agregatów (nowa wersja) zamiast łatek
+        aktualizowany jest portfolio-data-store, co odświeża wszystkie wykresy.
+        """
+        aggregates = self.data_layer.aggregates()
+        live = aggregates['live']
+        if state['version'] != aggregates['version']:
+            return (no_update,) * 4 + (self._live_state(), self._store_data())
+
+        changes = live.changes_since(state['seq'])
+        if not changes:
+            raise PreventUpdate
+
+        metrics = categories = repayment = recovery = no_update
+        if 'kpi' in changes:
+            metrics = Patch()
+            for i, value in enumerate(self._format_kpi(live.kpi()).values()):
+                metrics[i]['props']['children'][1]['props']['children'] = value
+        if 'categories' in changes:
+            categories = Patch()
+            categories['data'][0]['y'] = self.data_layer.category_table()['liczba_spraw'].tolist()
+        if 'daily' in changes:
+            repayment = self._tail_patch("repayment-trend")
+        if changes & {'daily', 'categories'}:
+            recovery = self._tail_patch("recovery-analysis")
+        if 'categories' in changes:
+            # Nowe sprawy zmieniają wartość portfela, czyli mianownik całego
+            # skumulowanego odzysku - historia przeskalowana, by nie było skoku na styku
+            x, y = self._history("recovery-analysis", *self._relayout_window(recovery_relayout))
+            recovery['data'][0]['x'] = x
+            recovery['data'][0]['y'] = y
+
+        return (metrics, categories, repayment, recovery,
+                {'version': state['version'], 'seq': live.seq}, no_update)
+
+    @staticmethod
+    def _format_kpi(kpi: Dict) -> Dict[str, str]:
+        return {
+            "Całkowita wartość portfela": f"{kpi['Całkowita wartość portfela']:,.0f} PLN",
+            "Średni score ryzyka": f"{kpi['Średni score ryzyka']:.2f}",
+            "Wskaźnik odzysku": f"{kpi['Wskaźnik odzysku']:.0%}",
+            "Aktywne sprawy": f"{kpi['Aktywne sprawy']:,}"
+        }
+
+    def _cached_figure(self, name: str, build: Callable[[Dict], go.Figure]) -> go.Figure:
+        """Wykres budowany raz na wersję agregatów i współdzielony przez wszystkie sesje."""
+        aggregates = self.data_layer.aggregates()
+        version, figure = self._figures.get(name, (None, None))
+        if version != aggregates['version']:
+            figure = build(aggregates)
+            self._figures[name] = (aggregates['version'], figure)
+        return figure
+
+    def _live_series(self, name: str, since: Optional[pd.Timestamp] = None) -> pd.Series:
+        live = self.data_layer.live
+        if name == "repayment-trend":
+            return live.daily_series(since)
+        return live.cumulative_recovery(since)
+
+    def _series_base(self, name: str) -> tuple:
+        """Zredukowana historia szeregu (bez ostatniego dnia) - raz na wersję agregatów.
+
+        Ostatni dzień i późniejsze tworzą osobny ślad "ogona" aktualizowany
+        łatkami; spłaty z wcześniejszych dni pojawiają się w historii przy
+        kolejnym pełnym przeliczeniu. Zapamiętywana jest też wartość portfela
+        z chwili budowy - mianownik skumulowanego odzysku.
+        """
+        version = self.data_layer.aggregates()['version']
+        cached = self._figures.get(name)
+        if cached is None or cached[0] != version:
+            series = self._live_series(name)
+            method = 'minmax' if name == "repayment-trend" else 'lttb'
+            x, y = downsample_series(series.iloc[:-1], self.max_points, method=method)
+            tail_start = series.index[-1] if len(series) else pd.Timestamp.now().normalize()
+            cached = (version, x, y, tail_start, self.data_layer.live.total_value)
+            self._figures[name] = cached
+        return cached
+
+    def _history(self,
+                 name: str,
+                 start: Optional[pd.Timestamp] = None,
+                 end: Optional[pd.Timestamp] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Ślad historii: zredukowana baza albo (po powiększeniu) bieżący wycinek szeregu."""
+        if start is not None:
+            method = 'minmax' if name == "repayment-trend" else 'lttb'
+            return downsample_series(self._live_series(name), self.max_points, start, end, method=method)
+
+        version, x, y, tail_start, total_value = self._series_base(name)
+        current = self.data_layer.live.total_value
+        if name == "recovery-analysis" and total_value and current and current != total_value:
+            # Baza liczona przy innej wartości portfela - przeskalowanie do bieżącej
+            y = y * (total_value / current)
+        return x, y
+
+    def _tail_patch(self, name: str) -> Patch:
+        tail = self._live_series(name, since=self._series_base(name)[3])
+        patch = Patch()
+        patch['data'][1]['x'] = series_to_epoch_ms(tail)
+        patch['data'][1]['y'] = tail.to_numpy(dtype=float)
+        return patch
+
+    def _zoomable_figure(self, name: str, relayout: Optional[Dict]) -> go.Figure:
+        """Pełny zakres ze zredukowanej historii; po powiększeniu wycinek w większej rozdzielczości."""
+        start, end = self._relayout_window(relayout)
+        if start is None and dash.ctx.triggered_id == name and not (relayout or {}).get('xaxis.autorange'):
+            # Zmiany układu bez osi x (np. autosize) nie wymagają nowych danych
+            raise PreventUpdate
+
+        version, _, _, tail_start, _ = self._series_base(name)
+        x, y = self._history(name, start, end)
+        tail = self._live_series(name, since=tail_start)
+
+        if name == "repayment-trend":
+            return self._time_series_figure(
+                x, y, tail, version, "Spłaty dzienne",
+                title="Trend Spłat w Czasie",
                 yaxis_title="Wartość Spłat (PLN)"
             )
-            
-            return fig
+        return self._time_series_figure(
+            x, y, tail, version, "Skumulowany odzysk",
+            title="Skumulowany Wskaźnik Odzysku",
+            yaxis_title="Odzyskana część portfela",
+            yaxis_tickformat='.0%'
+        )
+
+    @staticmethod
+    def _relayout_window(relayout: Optional[Dict]) -> Tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]:
+        """Zakres osi x z relayoutData wykresu (None gdy pełny zakres)."""
+        if not relayout or relayout.get('xaxis.autorange'):
+            return None, None
+        if 'xaxis.range[0]' in relayout:
+            return pd.Timestamp(relayout['xaxis.range[0]']), pd.Timestamp(relayout['xaxis.range[1]'])
+        if 'xaxis.range' in relayout:
+            return pd.Timestamp(relayout['xaxis.range'][0]), pd.Timestamp(relayout['xaxis.range'][1])
+        return None, None
+
+    def _risk_distribution_figure(self) -> go.Figure:
+        distribution = self.data_layer.category_table()
+        categories = [category.replace(" ryzyko", "") for category in distribution.index]
+        
+        fig = go.Figure(data=[
+            go.Bar(x=categories, y=distribution['liczba_spraw'].tolist(), marker_color='rgb(55, 83, 109)')
+        ])
+        
+        fig.update_layout(
+            title="Rozkład Kategorii Ryzyka",
+            xaxis_title="Kategoria Ryzyka",
+            yaxis_title="Liczba Przypadków",
+            showlegend=False
+        )
+        
+        return fig
+
+    @staticmethod
+    def _time_series_figure(x: np.ndarray,
+                            y: np.ndarray,
+                            tail: pd.Series,
+                            version: int,
+                            name: str,
+                            **layout) -> go.Figure:
+        """Historia (ślad 0) i bieżący ogon szeregu (ślad 1) w jednym kolorze."""
+        color = 'rgb(55, 83, 109)'
+        
+        fig = go.Figure(data=[
+            go.Scattergl(x=x, y=y, mode='lines', name=name, line_color=color),
+            go.Scattergl(x=series_to_epoch_ms(tail), y=tail.to_numpy(dtype=float), mode='lines+markers',
+                         name="Bieżące dane", line_color=color)
+        ])
+        
+        fig.update_layout(
+            xaxis_title="Data",
+            xaxis_type='date',
+            uirevision=version,
+            **layout
+        )
+        
+        return fig
+
+    def _recovery_forecast_figure(self, aggregates: Dict) -> go.Figure:
+        history_x, history_y = downsample_series(aggregates['trend_spłat'], self.max_points)
+        forecast = aggregates['prognoza_odzysków']
+        forecast_x = series_to_epoch_ms(forecast)
+        
+        fig = go.Figure(data=[
+            go.Scattergl(x=history_x, y=history_y, mode='lines', name="Historia"),
+            go.Scattergl(x=forecast_x, y=forecast['górna_granica'].to_numpy(), mode='lines',
+                         line_width=0, showlegend=False),
+            go.Scattergl(x=forecast_x, y=forecast['dolna_granica'].to_numpy(), mode='lines',
+                         line_width=0, fill='tonexty', name="Przedział ufności"),
+            go.Scattergl(x=forecast_x, y=forecast['prognoza'].to_numpy(), mode='lines',
+                         line_dash='dash', name="Prognoza")
+        ])
+        
+        fig.update_layout(
+            title="Prognoza Odzysków",
+            xaxis_title="Data",
+            yaxis_title="Wartość Spłat (PLN)",
+            xaxis_type='date'
+        )
+        
+        return fig
 
     def run_server(self, debug=True, port=8050):
         """Uruchomienie serwera dashboardu."""
@@ -1,11 +1,17 @@
+import hashlib
+import os
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Optional
+import joblib
+from typing import Dict, List, Optional, Tuple, Union
 from sklearn.linear_model import LinearRegression
 from datetime import datetime, timedelta
+from itertools import product
+
+from provisions.trend_tracker import ProvisionsTrendTracker
 
 class ProvisionsCalculator:
-    def __init__(self):
+    def __init__(self, model_cache_dir: Optional[str] = None):
         self.provision_rates = {
             'Niskie ryzyko': 0.05,
             'Średnio-niskie ryzyko': 0.10,
@@ -13,27 +19,91 @@ class ProvisionsCalculator:
             'Średnio-wysokie ryzyko': 0.50,
             'Wysokie ryzyko': 0.75
         }
+        self.risk_categories = list(self.provision_rates)
         self.model = LinearRegression()
+        self.loss_features = ['amount', 'age', 'risk_score']
+        # Modele strat kluczowane skrótem danych treningowych (pamięć + opcjonalnie dysk)
+        self.model_cache_dir = model_cache_dir
+        self._model_cache: Dict[str, LinearRegression] = {}
+        self.model_key: Optional[str] = None
 
     def calculate_base_provisions(self,
                                 portfolio: pd.DataFrame,
                                 risk_categories: Dict[str, float]) -> Dict:
         """Obliczenie bazowych rezerw dla portfela."""
-        provisions = {}
-        total_provision = 0
-
-        for category in self.provision_rates:
-            category_amount = portfolio[portfolio['risk_category'] == category]['amount'].sum()
-            provision = category_amount * self.provision_rates[category]
-            provisions[category] = provision
-            total_provision += provision
+        category_amounts, total_amount = self._amounts_by_category(portfolio)
+        rates = np.array([self.provision_rates[category] for category in self.risk_categories])
+        provisions = category_amounts * rates
+        total_provision = provisions.sum()
 
         return {
-            'rezerwy_per_kategoria': provisions,
+            'rezerwy_per_kategoria': dict(zip(self.risk_categories, provisions)),
             'całkowita_rezerwa': total_provision,
-            'wskaźnik_pokrycia': total_provision / portfolio['amount'].sum()
+            'wskaźnik_pokrycia': total_provision / total_amount
         }
 
+    def calculate_provisions_by_table(self,
+                                      portfolio: pd.DataFrame,
+                                      rate_tables: Dict[str, Dict[str, float]]) -> pd.DataFrame:
+        """Rezerwy per kategoria dla wielu tabel stawek naraz (np. etapy IFRS 9).
+
+        Portfel skanowany jest raz; kolejne tabele to tylko mnożenie
+        wektora kwot per kategoria przez macierz stawek.
+        """
+        category_amounts, _ = self._amounts_by_category(portfolio)
+        rates = self._rate_matrix(rate_tables)
+
+        return pd.DataFrame((rates * category_amounts).T,
+                            index=self.risk_categories,
+                            columns=list(rate_tables))
+
+    def calculate_loan_provisions(self,
+                                  portfolio: pd.DataFrame,
+                                  rate_tables: Optional[Dict[str, Dict[str, float]]] = None,
+                                  stage_column: Optional[str] = None) -> pd.DataFrame:
+        """Rezerwy na poziomie pojedynczych ekspozycji.
+
+        Bez `stage_column` zwraca kolumnę rezerwy dla każdej tabeli stawek.
+        Z `stage_column` każda ekspozycja dostaje stawkę z tabeli swojego etapu
+        (klucze `rate_tables` to wartości tej kolumny).
+        """
+        rate_tables = rate_tables or {'rezerwa': self.provision_rates}
+        category_codes = self._category_codes(portfolio)
+        amounts = portfolio['amount'].to_numpy(dtype=float)
+
+        # Dodatkowy wiersz i kolumna zer - kod -1 (nieznana kategoria/etap) wskazuje na nie
+        rates = np.zeros((len(rate_tables) + 1, len(self.risk_categories) + 1))
+        rates[:-1, :-1] = self._rate_matrix(rate_tables)
+
+        if stage_column is not None:
+            stage_codes = pd.Categorical(portfolio[stage_column],
+                                         categories=list(rate_tables)).codes
+            return pd.DataFrame({'rezerwa': amounts * rates[stage_codes, category_codes]},
+                                index=portfolio.index)
+
+        return pd.DataFrame(amounts[:, None] * rates[:-1, category_codes].T,
+                            index=portfolio.index,
+                            columns=list(rate_tables))
+
+    def _category_codes(self, portfolio: pd.DataFrame) -> np.ndarray:
+        """Kody kategorii ryzyka (-1 dla kategorii spoza tabeli stawek)."""
+        return pd.Categorical(portfolio['risk_category'],
+                              categories=self.risk_categories).codes.astype(np.intp)
+
+    def _amounts_by_category(self, portfolio: pd.DataFrame) -> Tuple[np.ndarray, float]:
+        """Kwoty per kategoria i kwota całkowita w jednym przebiegu."""
+        sums = np.bincount(self._category_codes(portfolio) + 1,
+                           weights=portfolio['amount'].to_numpy(dtype=float),
+                           minlength=len(self.risk_categories) + 1)
+        return sums[1:], sums.sum()
+
+    def _rate_matrix(self, rate_tables: Dict[str, Dict[str, float]]) -> np.ndarray:
+        """Macierz stawek (tabele × kategorie); brak kategorii w tabeli oznacza 0."""
+        return np.array([
+            [table.get(category, 0.0) for category in self.risk_categories]
+            for table in rate_tables.values()
+        ])
+
     def adjust_for_aging(self,
                         base_provisions: float,
                         age_distribution: Dict[str, float]) -> float:
@@ -55,15 +125,21 @@ class ProvisionsCalculator:
 
     def calculate_expected_losses(self,
                                 historical_data: pd.DataFrame,
-                                forecast_period: int = 12) -> Dict:
-        """Obliczenie oczekiwanych strat na podstawie danych historycznych."""
-        X = historical_data[['amount', 'age', 'risk_score']]
-        y = historical_data['loss']
+                                forecast_period: int = 12,
+                                portfolio: Optional[pd.DataFrame] = None) -> Dict:
+        """Obliczenie oczekiwanych strat na podstawie danych historycznych.
+
+        Model uczony jest na `historical_data` (z pamięci podręcznej, jeśli dane
+        się nie zmieniły), a prognoza dotyczy `portfolio` na koniec horyzontu
+        `forecast_period` miesięcy. Bez `portfolio` prognozowane są ekspozycje
+        z danych historycznych.
+        """
+        self.fit_loss_model(historical_data)
+        forecast = self.forecast_losses(
+            historical_data if portfolio is None else portfolio, forecast_period
+        )
+        future_losses = forecast['straty_per_ekspozycja'][:, -1]
 
-        self.model.fit(X, y)
-        
-        future_losses = self.model.predict(X)
-        
         return {
             'średnia_strata': np.mean(future_losses),
             'maksymalna_strata': np.max(future_losses),
@@ -71,7 +147,64 @@ class ProvisionsCalculator:
             'przedział_ufności': [
                 np.percentile(future_losses, 5),
                 np.percentile(future_losses, 95)
-            ]
+            ],
+            'prognoza_miesięczna': forecast['prognoza_miesięczna']
+        }
+
+    def fit_loss_model(self, historical_data: pd.DataFrame) -> str:
+        """Dopasowanie modelu strat; ponowne użycie modelu dla niezmienionych danych."""
+        training_data = historical_data[self.loss_features + ['loss']]
+        key = hashlib.sha256(
+            pd.util.hash_pandas_object(training_data, index=False).to_numpy().tobytes()
+        ).hexdigest()
+
+        if key == self.model_key:
+            return key
+
+        model = self._model_cache.get(key)
+        cache_path = (os.path.join(self.model_cache_dir, f"loss_model_{key}.joblib")
+                      if self.model_cache_dir else None)
+
+        if model is None and cache_path and os.path.exists(cache_path):
+            model = joblib.load(cache_path)
+
+        if model is None:
+            model = LinearRegression()
+            model.fit(training_data[self.loss_features], training_data['loss'])
+            if cache_path:
+                os.makedirs(self.model_cache_dir, exist_ok=True)
+                joblib.dump(model, cache_path)
+
+        self._model_cache[key] = model
+        self.model = model
+        self.model_key = key
+        return key
+
+    def forecast_losses(self,
+                        portfolio: pd.DataFrame,
+                        horizon: int = 12,
+                        days_per_month: int = 30) -> Dict:
+        """Prognoza strat miesiąc po miesiącu dla bieżącego portfela.
+
+        Wiek ekspozycji (w dniach) rośnie o `days_per_month` w każdym miesiącu;
+        cała macierz ekspozycje × miesiące liczona jest jednym iloczynem macierzowym.
+        """
+        if self.model_key is None:
+            raise ValueError("Model strat nie został dopasowany - użyj fit_loss_model")
+
+        X = portfolio[self.loss_features].to_numpy(dtype=float)
+        months = np.arange(1, horizon + 1)
+
+        # Cechy w kolejnych miesiącach: (miesiące × ekspozycje × cechy)
+        age_shift = np.zeros((horizon, 1, len(self.loss_features)))
+        age_shift[:, 0, self.loss_features.index('age')] = months * days_per_month
+        features = X[None, :, :] + age_shift
+
+        losses = np.maximum(features @ self.model.coef_ + self.model.intercept_, 0).T
+
+        return {
+            'straty_per_ekspozycja': losses,
+            'prognoza_miesięczna': pd.Series(losses.sum(axis=0), index=months, name='strata')
         }
 
     def perform_stress_test(self,
@@ -79,33 +212,99 @@ class ProvisionsCalculator:
                           portfolio_data: pd.DataFrame,
                           scenarios: List[Dict]) -> Dict:
         """Przeprowadzenie stress-testów dla rezerw."""
+        multipliers = self._stress_multipliers(pd.DataFrame(scenarios))
+        stressed_provisions = current_provisions * multipliers
+        total_amount = portfolio_data['amount'].sum()
+
         results = {}
-        
-        for scenario in scenarios:
-            stressed_provisions = current_provisions
-            
-            if 'default_rate_increase' in scenario:
-                stressed_provisions *= (1 + scenario['default_rate_increase'])
-                
-            if 'recovery_rate_decrease' in scenario:
-                stressed_provisions /= (1 - scenario['recovery_rate_decrease'])
-                
-            if 'market_downturn' in scenario:
-                stressed_provisions *= (1 + scenario['market_downturn'] * 0.5)
-                
+        for scenario, stressed in zip(scenarios, stressed_provisions):
             results[scenario['name']] = {
-                'wymagane_rezerwy': stressed_provisions,
-                'niedobór_rezerw': max(0, stressed_provisions - current_provisions),
-                'wskaźnik_pokrycia': stressed_provisions / portfolio_data['amount'].sum()
+                'wymagane_rezerwy': stressed,
+                'niedobór_rezerw': max(0, stressed - current_provisions),
+                'wskaźnik_pokrycia': stressed / total_amount
             }
-            
+
         return results
 
+    def run_stress_scenarios(self,
+                             portfolio: pd.DataFrame,
+                             scenarios: pd.DataFrame) -> Dict:
+        """Stress-test macierzowy dla tysięcy scenariuszy naraz.
+
+        Każdy wiersz `scenarios` to scenariusz z szokami default_rate_increase,
+        recovery_rate_decrease, market_downturn oraz opcjonalnymi kolumnami
+        o nazwach kategorii ryzyka nadpisującymi stawkę rezerwy (NaN - bez zmian).
+        Rezerwa jest liniowa względem kwoty, więc szoki na poziomie ekspozycji
+        sprowadzają się do kwot per kategoria - portfel skanowany jest raz.
+        """
+        category_amounts, total_amount = self._amounts_by_category(portfolio)
+        base_rates = np.array([self.provision_rates[category] for category in self.risk_categories])
+
+        # Stawki scenariusz × kategoria z nadpisaniami per kategoria
+        rates = np.tile(base_rates, (len(scenarios), 1))
+        for column, category in enumerate(self.risk_categories):
+            if category in scenarios.columns:
+                overrides = scenarios[category].to_numpy(dtype=float)
+                rates[:, column] = np.where(np.isnan(overrides), base_rates[column], overrides)
+
+        cube = category_amounts * rates * self._stress_multipliers(scenarios)[:, None]
+        current_provisions = category_amounts @ base_rates
+        required = cube.sum(axis=1)
+
+        summary = pd.DataFrame({
+            'wymagane_rezerwy': required,
+            'niedobór_rezerw': np.maximum(0, required - current_provisions),
+            'wskaźnik_pokrycia': required / total_amount
+        }, index=scenarios['name'] if 'name' in scenarios.columns else scenarios.index)
+
+        return {
+            'rezerwy_scenariusz_kategoria': pd.DataFrame(cube, index=summary.index,
+                                                         columns=self.risk_categories),
+            'podsumowanie': summary,
+            'obecne_rezerwy': current_provisions
+        }
+
+    def reverse_stress_test(self,
+                            portfolio: pd.DataFrame,
+                            scenarios: pd.DataFrame,
+                            provisions_capacity: float) -> pd.DataFrame:
+        """Odwrócony stress-test - scenariusze, w których rezerwy przekraczają dostępny poziom.
+
+        Wynik posortowany od najłagodniejszego scenariusza powodującego przekroczenie.
+        """
+        summary = self.run_stress_scenarios(portfolio, scenarios)['podsumowanie']
+        shocks = scenarios.set_index(summary.index)
+
+        breaches = summary[summary['wymagane_rezerwy'] > provisions_capacity]
+        return shocks.loc[breaches.index].join(breaches).sort_values('wymagane_rezerwy')
+
+    @staticmethod
+    def build_stress_grid(**shock_ranges: np.ndarray) -> pd.DataFrame:
+        """Siatka scenariuszy - iloczyn kartezjański zakresów szoków."""
+        grid = pd.DataFrame(list(product(*shock_ranges.values())), columns=list(shock_ranges))
+        grid['name'] = [f"grid_{i}" for i in range(len(grid))]
+        return grid
+
+    def _stress_multipliers(self, scenarios: pd.DataFrame) -> np.ndarray:
+        """Mnożniki rezerw dla każdego scenariusza (brak szoku = 0)."""
+        def shock(column: str) -> np.ndarray:
+            if column not in scenarios.columns:
+                return np.zeros(len(scenarios))
+            return scenarios[column].fillna(0).to_numpy(dtype=float)
+
+        return ((1 + shock('default_rate_increase')) /
+                (1 - shock('recovery_rate_decrease')) *
+                (1 + shock('market_downturn') * 0.5))
+
     def generate_provisions_report(self,
                                  current_state: Dict,
-                                 historical_trend: pd.DataFrame,
+                                 historical_trend: Union[pd.DataFrame, ProvisionsTrendTracker],
                                  stress_test_results: Dict) -> Dict:
-        """Generowanie raportu o stanie rezerw."""
+        """Generowanie raportu o stanie rezerw.
+
+        Trend można przekazać jako pełną historię lub utrwalony tracker
+        aktualizowany przyrostowo (bez ponownego skanowania historii).
+        """
         report = {
             'stan_obecny': {
                 'poziom_rezerw': current_state['całkowita_rezerwa'],
@@ -119,17 +318,13 @@ class ProvisionsCalculator:
         
         return report
 
-    def _analyze_provisions_trend(self, historical_data: pd.DataFrame) -> Dict:
+    def _analyze_provisions_trend(self,
+                                  historical_data: Union[pd.DataFrame, ProvisionsTrendTracker]) -> Dict:
         """Analiza trendu zmian w rezerwach."""
-        trend = {
-            'zmiana_roczna': (historical_data['provisions'].iloc[-1] / 
-                             historical_data['provisions'].iloc[-12] - 1),
-            'zmienność': historical_data['provisions'].std() / historical_data['provisions'].mean(),
-            'trend_kierunek': 'wzrostowy' if historical_data['provisions'].iloc[-1] > 
-                             historical_data['provisions'].iloc[-6] else 'spadkowy'
-        }
-        
-        return trend
+        if isinstance(historical_data, ProvisionsTrendTracker):
+            return historical_data.analysis()
+
+        return ProvisionsTrendTracker.from_history(historical_data['provisions']).analysis()
 
     def _generate_recommendations(self,
                                 current_state: Dict,
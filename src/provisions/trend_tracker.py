@@ -0,0 +1,115 @@
+import json
+import math
+from collections import deque
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+
+
+class ProvisionsTrendTracker:
+    """Przyrostowe śledzenie trendu rezerw.
+
+    Średnia i wariancja liczone są algorytmem Welforda, a ostatnie
+    `window` odczytów trzymane w oknie kroczącym - dodanie nowego stanu
+    na koniec miesiąca kosztuje O(1). Stan można zapisać do JSON
+    i wczytać przy kolejnym uruchomieniu.
+
+    Ponowne przesłanie stanu z tą samą datą (np. w dziennym lub
+    śróddziennym przebiegu) zastępuje ostatni odczyt zamiast liczyć go
+    drugi raz; data wcześniejsza niż ostatnia jest odrzucana.
+    """
+
+    def __init__(self, window: int = 12):
+        self.window = window
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.recent = deque(maxlen=window)
+        self.last_date: Optional[str] = None
+
+    @classmethod
+    def from_history(cls, provisions: Iterable[float], window: int = 12) -> 'ProvisionsTrendTracker':
+        """Zbudowanie trackera z historycznego szeregu rezerw."""
+        tracker = cls(window)
+        for value in provisions:
+            tracker.update(value)
+        return tracker
+
+    def update(self, provisions: float, date: Optional[str] = None) -> None:
+        """Dodanie kolejnego stanu rezerw (lub korekta stanu z ostatniej daty)."""
+        provisions = float(provisions)
+        if date is not None and self.last_date is not None:
+            current, last = pd.Timestamp(date), pd.Timestamp(self.last_date)
+            if current < last:
+                raise ValueError(f"Data {date} jest wcześniejsza niż ostatni odczyt {self.last_date}")
+            if current == last:
+                self._remove_last()
+
+        self.count += 1
+        delta = provisions - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (provisions - self.mean)
+        self.recent.append(provisions)
+        if date is not None:
+            self.last_date = str(date)
+
+    def _remove_last(self) -> None:
+        """Wycofanie ostatniego odczytu (odwrócony krok Welforda)."""
+        value = self.recent.pop()
+        if self.count == 1:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        mean = (self.count * self.mean - value) / (self.count - 1)
+        self.m2 = max(self.m2 - (value - self.mean) * (value - mean), 0.0)
+        self.mean = mean
+        self.count -= 1
+
+    @property
+    def std(self) -> float:
+        """Odchylenie standardowe próby (jak pandas Series.std)."""
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else float('nan')
+
+    def analysis(self) -> Dict:
+        """Analiza trendu; wskaźniki wymagające dłuższej historii mają wartość None."""
+        if not self.recent:
+            return {'zmiana_roczna': None, 'zmienność': None, 'trend_kierunek': None,
+                    'średnia_krocząca': None}
+
+        last = self.recent[-1]
+        year_ago = self.recent[0] if len(self.recent) == self.window else None
+        half_year_ago = self.recent[-6] if len(self.recent) >= 6 else None
+
+        return {
+            'zmiana_roczna': last / year_ago - 1 if year_ago else None,
+            'zmienność': self.std / self.mean if self.count > 1 and self.mean else None,
+            'trend_kierunek': (None if half_year_ago is None else
+                               'wzrostowy' if last > half_year_ago else 'spadkowy'),
+            'średnia_krocząca': sum(self.recent) / len(self.recent)
+        }
+
+    def save(self, path: str) -> None:
+        """Zapis stanu trackera do pliku JSON."""
+        state = {
+            'window': self.window,
+            'count': self.count,
+            'mean': self.mean,
+            'm2': self.m2,
+            'recent': list(self.recent),
+            'last_date': self.last_date
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+
+    @classmethod
+    def load(cls, path: str) -> 'ProvisionsTrendTracker':
+        """Wczytanie stanu trackera z pliku JSON."""
+        with open(path, encoding='utf-8') as f:
+            state = json.load(f)
+
+        tracker = cls(state['window'])
+        tracker.count = state['count']
+        tracker.mean = state['mean']
+        tracker.m2 = state['m2']
+        tracker.recent.extend(state['recent'])
+        tracker.last_date = state['last_date']
+        return tracker
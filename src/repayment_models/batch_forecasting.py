@@ -0,0 +1,82 @@
+import time
+import warnings
+import numpy as np
+from scipy.stats import norm
+from statsmodels.tsa.arima.model import ARIMA
+from typing import Dict, List, Optional, Tuple
+
+# Minimalna długość szeregu, dla której dopasowywany jest model ARIMA
+MIN_ARIMA_OBSERVATIONS = 24
+
+
+def random_walk_forecast(series: np.ndarray,
+                         steps: int,
+                         start: Optional[np.ndarray] = None,
+                         alpha: float = 0.05) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Wektorowa prognoza błądzenia losowego z dryfem dla macierzy szeregów.
+
+    Odpowiada ARIMA(0,1,0) ze stałą (dryfem) - stosowana dla krótkich lub
+    płaskich szeregów, gdzie estymacja ARIMA jest niestabilna.
+    `series` ma kształt (segmenty × miesiące), `start` to indeks pierwszego
+    miesiąca aktywności segmentu. Zwraca prognozy i granice przedziału
+    ufności o kształcie (segmenty × kroki).
+    """
+    series = np.atleast_2d(np.asarray(series, dtype=float))
+    if start is None:
+        start = np.zeros(len(series), dtype=int)
+
+    diffs = np.diff(series, axis=1)
+    valid = np.arange(diffs.shape[1])[None, :] >= np.asarray(start)[:, None]
+    n_diffs = valid.sum(axis=1)
+
+    drift = np.where(valid, diffs, 0).sum(axis=1) / np.maximum(n_diffs, 1)
+    squared = np.where(valid, (diffs - drift[:, None]) ** 2, 0).sum(axis=1)
+    sigma = np.sqrt(np.where(n_diffs > 1, squared / np.maximum(n_diffs - 1, 1), 0))
+
+    horizon = np.arange(1, steps + 1)
+    forecast = series[:, -1:] + drift[:, None] * horizon
+    margin = norm.ppf(1 - alpha / 2) * sigma[:, None] * np.sqrt(horizon)
+    return forecast, forecast - margin, forecast + margin
+
+
+def arima_forecast(series: np.ndarray,
+                   steps: int,
+                   order: Tuple[int, int, int] = (1, 1, 1),
+                   alpha: float = 0.05) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Dopasowanie ARIMA i jednokrotne wyliczenie prognozy z przedziałami."""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        fitted = ARIMA(series, order=order).fit()
+        forecast = fitted.get_forecast(steps)
+
+    intervals = np.asarray(forecast.conf_int(alpha=alpha))
+    return np.asarray(forecast.predicted_mean), intervals[:, 0], intervals[:, 1]
+
+
+def forecast_segment_batch(batch: List[Tuple[int, np.ndarray]], steps: int) -> List[Dict]:
+    """Prognozy ARIMA dla porcji segmentów (wywoływane w procesie roboczym).
+
+    Segmenty, dla których estymacja się nie powiodła, zwracane są z metodą
+    'failed' - proces główny liczy dla nich prognozę zastępczą.
+    """
+    results = []
+
+    for segment_id, series in batch:
+        start = time.perf_counter()
+        try:
+            forecast, lower, upper = arima_forecast(series, steps)
+            method = 'arima'
+        except (ValueError, np.linalg.LinAlgError):
+            forecast = lower = upper = None
+            method = 'failed'
+
+        results.append({
+            'segment_id': segment_id,
+            'forecast': forecast,
+            'lower': lower,
+            'upper': upper,
+            'method': method,
+            'elapsed': time.perf_counter() - start
+        })
+
+    return results
@@ -0,0 +1,123 @@
+import hashlib
+import os
+import pickle
+import warnings
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.arima.model import ARIMA
+from typing import Dict, Optional, Tuple
+
+
+class ARIMAStateStore:
+    """Trwały magazyn dopasowanych modeli ARIMA (parametry + stan filtru Kalmana).
+
+    Nowe obserwacje dołączane są przez `extend` - filtr przechodzi tylko
+    po nowych miesiącach przy zachowanych parametrach. Pełna estymacja
+    (startująca od poprzednich parametrów) wykonywana jest co `refit_every`
+    miesięcy lub gdy standaryzowany błąd prognozy nowych obserwacji
+    przekroczy `drift_threshold`.
+    """
+
+    def __init__(self,
+                 directory: str,
+                 order: Tuple[int, int, int] = (1, 1, 1),
+                 refit_every: int = 12,
+                 drift_threshold: float = 3.0):
+        self.directory = directory
+        self.order = order
+        self.refit_every = refit_every
+        self.drift_threshold = drift_threshold
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, series_id) -> str:
+        name = hashlib.sha1(str(series_id).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f"arima_{name}.pkl")
+
+    def _load(self, series_id) -> Dict:
+        path = self._path(series_id)
+        if not os.path.exists(path):
+            raise KeyError(f"Brak modelu dla szeregu: {series_id}")
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def _save(self, series_id, state: Dict) -> None:
+        path = self._path(series_id)
+        # Zapis atomowy - przerwany zapis nie uszkadza poprzedniego stanu
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(state, f)
+        os.replace(path + '.tmp', path)
+
+    def __contains__(self, series_id) -> bool:
+        return os.path.exists(self._path(series_id))
+
+    def fit(self,
+            series_id,
+            series: np.ndarray,
+            start_params: Optional[np.ndarray] = None) -> Dict:
+        """Pełna estymacja modelu i zapis stanu."""
+        history = np.asarray(series, dtype=float)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            results = ARIMA(history, order=self.order).fit(start_params=start_params)
+
+        state = {
+            'series_id': series_id,
+            'results': results,
+            'history': history,
+            'months_since_refit': 0
+        }
+        self._save(series_id, state)
+        return state
+
+    def update(self, series_id, new_observations: np.ndarray) -> Dict:
+        """Dołączenie nowych obserwacji bez ponownej estymacji (chyba że wymagana)."""
+        state = self._load(series_id)
+        new_observations = np.atleast_1d(np.asarray(new_observations, dtype=float))
+        results = state['results']
+
+        # Wykrycie dryfu na podstawie prognozy sprzed dołączenia danych
+        forecast = results.get_forecast(len(new_observations))
+        errors = (new_observations - forecast.predicted_mean) / np.sqrt(forecast.var_pred_mean)
+        drift = bool(np.any(np.abs(errors) > self.drift_threshold))
+
+        history = np.concatenate([state['history'], new_observations])
+        months_since_refit = state['months_since_refit'] + len(new_observations)
+
+        if drift or months_since_refit >= self.refit_every:
+            self.fit(series_id, history, start_params=results.params)
+            status = 'refitted'
+        else:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                extended = results.extend(new_observations)
+            self._save(series_id, {
+                'series_id': series_id,
+                'results': extended,
+                'history': history,
+                'months_since_refit': months_since_refit
+            })
+            status = 'extended'
+
+        return {
+            'series_id': series_id,
+            'status': status,
+            'drift': drift,
+            'max_abs_error': float(np.max(np.abs(errors)))
+        }
+
+    def update_many(self, new_observations: Dict) -> pd.DataFrame:
+        """Aktualizacja wielu szeregów; zwraca tabelę statusów."""
+        return pd.DataFrame([
+            self.update(series_id, observations)
+            for series_id, observations in new_observations.items()
+        ])
+
+    def forecast(self, series_id, steps: int = 12, alpha: float = 0.05) -> Dict:
+        """Prognoza z bieżącego stanu modelu."""
+        forecast = self._load(series_id)['results'].get_forecast(steps)
+        intervals = np.asarray(forecast.conf_int(alpha=alpha))
+
+        return {
+            'predicted_payments': np.asarray(forecast.predicted_mean),
+            'confidence_intervals': intervals
+        }
@@ -0,0 +1,111 @@
+import hashlib
+import numpy as np
+from typing import Dict, Union
+
+Curves = Union[float, np.ndarray, Dict[str, Union[float, np.ndarray]]]
+
+# Przesunięcie krzywej o jeden punkt bazowy
+BASIS_POINT = 0.0001
+
+
+class NPVEngine:
+    """Macierzowy kalkulator NPV dla portfeli przepływów pieniężnych.
+
+    Przepływy podawane są jako macierz (sprawy × okresy), a krzywe dyskontowe
+    jako stopy per okres - liczba (krzywa płaska), wektor struktury
+    terminowej, macierz (krzywe × okresy) lub słownik nazwa -> krzywa.
+    Czynniki dyskontowe są buforowane, więc kolejne wyceny na tych samych
+    krzywych to jedno mnożenie macierzy.
+    """
+
+    def __init__(self, max_cache_size: int = 128):
+        self.max_cache_size = max_cache_size
+        self._discount_cache: Dict[str, np.ndarray] = {}
+
+    def curve_matrix(self, curves: Curves, n_periods: int) -> np.ndarray:
+        """Ujednolicenie krzywych do macierzy stóp (krzywe × okresy).
+
+        Krzywe dłuższe niż liczba okresów są przycinane; krótsze powodują
+        ValueError.
+        """
+        if isinstance(curves, dict):
+            return np.vstack([self.curve_matrix(curve, n_periods) for curve in curves.values()])
+
+        rates = np.atleast_2d(np.asarray(curves, dtype=float))
+        if rates.ndim != 2:
+            raise ValueError(f"Krzywe muszą być liczbą, wektorem lub macierzą, otrzymano wymiar {rates.ndim}")
+        if rates.shape[1] == 1:
+            return np.broadcast_to(rates, (rates.shape[0], n_periods))
+        if rates.shape[1] < n_periods:
+            raise ValueError(
+                f"Krzywa dyskontowa ma {rates.shape[1]} okresów, a przepływy {n_periods}"
+            )
+        return rates[:, :n_periods]
+
+    def discount_factors(self, curves: Curves, n_periods: int) -> np.ndarray:
+        """Czynniki dyskontowe (krzywe × okresy) z bufora lub wyliczone."""
+        rates = np.ascontiguousarray(self.curve_matrix(curves, n_periods))
+        key = hashlib.sha1(rates.tobytes() + str(rates.shape).encode()).hexdigest()
+
+        factors = self._discount_cache.get(key)
+        if factors is None:
+            periods = np.arange(1, n_periods + 1)
+            factors = (1 + rates) ** -periods
+            if len(self._discount_cache) >= self.max_cache_size:
+                self._discount_cache.pop(next(iter(self._discount_cache)))
+            self._discount_cache[key] = factors
+        return factors
+
+    def npv(self, cashflows: np.ndarray, curves: Curves) -> np.ndarray:
+        """NPV per sprawa i per krzywa (sprawy × krzywe)."""
+        cashflows = np.atleast_2d(np.asarray(cashflows, dtype=float))
+        return cashflows @ self.discount_factors(curves, cashflows.shape[1]).T
+
+    def dv01(self, cashflows: np.ndarray, curves: Curves) -> np.ndarray:
+        """Zmiana NPV przy równoległym wzroście krzywych o 1 pb (sprawy × krzywe)."""
+        cashflows = np.atleast_2d(np.asarray(cashflows, dtype=float))
+        rates = self.curve_matrix(curves, cashflows.shape[1])
+        return self.npv(cashflows, rates + BASIS_POINT) - self.npv(cashflows, rates)
+
+    def irr(self,
+            cashflows: np.ndarray,
+            prices: Union[float, np.ndarray],
+            tol: float = 1e-10,
+            max_iter: int = 100) -> np.ndarray:
+        """Wewnętrzna stopa zwrotu per okres dla każdej sprawy przy zadanej cenie zakupu.
+
+        Metoda Newtona liczona wektorowo dla wszystkich wierszy naraz.
+        Wiersz uznawany jest za zbieżny, gdy |NPV - cena| spada poniżej `tol`
+        względem sumy modułów przepływów. NaN otrzymują wiersze bez zmiany
+        znaku przepływów (łącznie z ceną), z zerową pochodną lub bez zbieżności.
+        """
+        cashflows = np.atleast_2d(np.asarray(cashflows, dtype=float))
+        prices = np.broadcast_to(np.asarray(prices, dtype=float), (len(cashflows),))
+        periods = np.arange(1, cashflows.shape[1] + 1)
+
+        # Bez zmiany znaku (np. same zera) IRR nie istnieje
+        has_inflow = (cashflows > 0).any(axis=1) | (prices < 0)
+        has_outflow = (cashflows < 0).any(axis=1) | (prices > 0)
+        failed = ~(has_inflow & has_outflow)
+        scale = np.maximum(np.abs(cashflows).sum(axis=1) + np.abs(prices), 1.0)
+
+        rate = np.full(len(cashflows), 0.01)
+        converged = np.zeros(len(cashflows), dtype=bool)
+
+        for _ in range(max_iter):
+            active = ~(converged | failed)
+            if not active.any():
+                break
+
+            factors = (1 + rate[:, None]) ** -periods
+            value = (cashflows * factors).sum(axis=1) - prices
+            derivative = -(cashflows * periods * factors / (1 + rate[:, None])).sum(axis=1)
+
+            converged |= active & (np.abs(value) < tol * scale)
+            failed |= active & ~converged & (derivative == 0)
+
+            step = np.divide(value, derivative, out=np.zeros_like(value), where=derivative != 0)
+            # Stopa nie może spaść do -100% lub niżej
+            rate = np.where(converged | failed, rate, np.maximum(rate - step, -0.99))
+
+        return np.where(converged, rate, np.nan)
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+from typing import Optional
+
+
+def debtor_payment_features(ledger: pd.DataFrame,
+                            debtor_column: str = 'debtor_id',
+                            date_column: str = 'payment_date',
+                            amount_column: str = 'payment_amount',
+                            payment_dates: Optional[pd.Series] = None) -> pd.DataFrame:
+    """Cechy wzorców spłat dla każdego dłużnika w jednym przebiegu po księdze.
+
+    Daty parsowane są raz (albo przekazane już sparsowane w `payment_dates`),
+    wiersze sortowane po (dłużnik, data), a wszystkie statystyki liczone przez
+    bincount na kodach dłużników. Odstępy między spłatami liczone są wyłącznie
+    w obrębie jednego dłużnika.
+    """
+    debtor_codes, debtors = pd.factorize(ledger[debtor_column])
+    if payment_dates is None:
+        payment_dates = pd.to_datetime(ledger[date_column])
+    dates = payment_dates.to_numpy()
+    amounts = ledger[amount_column].to_numpy(dtype=float)
+
+    order = np.lexsort((dates, debtor_codes))
+    debtor_codes, dates, amounts = debtor_codes[order], dates[order], amounts[order]
+    n_debtors = len(debtors)
+
+    counts = np.bincount(debtor_codes, minlength=n_debtors)
+    totals = np.bincount(debtor_codes, weights=amounts, minlength=n_debtors)
+    medians = pd.Series(amounts).groupby(debtor_codes, sort=True).median().to_numpy()
+
+    # Odstępy w dniach tylko między kolejnymi spłatami tego samego dłużnika
+    same_debtor = debtor_codes[1:] == debtor_codes[:-1]
+    intervals = (np.diff(dates) / np.timedelta64(1, 'D'))[same_debtor]
+    interval_codes = debtor_codes[1:][same_debtor]
+    n_intervals = np.bincount(interval_codes, minlength=n_debtors)
+    interval_sum = np.bincount(interval_codes, weights=intervals, minlength=n_debtors)
+    interval_sq = np.bincount(interval_codes, weights=intervals ** 2, minlength=n_debtors)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        interval_mean = interval_sum / n_intervals
+        interval_var = (interval_sq - n_intervals * interval_mean ** 2) / (n_intervals - 1)
+        interval_std = np.sqrt(np.maximum(interval_var, 0))
+        regularity = np.where(n_intervals > 1, 1 - interval_std / interval_mean, 0.0)
+
+        # Średnia spłata w każdym miesiącu kalendarzowym (dłużnicy × 12)
+        months = (dates.astype('datetime64[M]').astype(np.int64) % 12)
+        cell = debtor_codes * 12 + months
+        month_counts = np.bincount(cell, minlength=n_debtors * 12).reshape(n_debtors, 12)
+        month_sums = np.bincount(cell, weights=amounts, minlength=n_debtors * 12).reshape(n_debtors, 12)
+        month_means = np.where(month_counts > 0, month_sums / month_counts, np.nan)
+
+        peak_month = np.nanargmax(np.where(month_counts > 0, month_means, -np.inf), axis=1) + 1
+        seasonality_strength = np.nanmax(month_means, axis=1) / np.nanmean(month_means, axis=1)
+
+    return pd.DataFrame({
+        'liczba_spłat': counts,
+        'suma_spłat': totals,
+        'średnia_spłata': totals / counts,
+        'mediana_spłat': medians,
+        'średni_odstęp_dni': interval_mean,
+        'regularność_spłat': regularity,
+        'miesiąc_szczytowy': peak_month,
+        'siła_sezonowości': seasonality_strength
+    }, index=pd.Index(debtors, name=debtor_column))
@@ -1,10 +1,21 @@
+import os
+import time
 import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from sklearn.preprocessing import StandardScaler
 from statsmodels.tsa.arima.model import ARIMA
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Union
 import lightgbm as lgb
 
+from common.data_sources import read_portfolio_chunks
+from repayment_models.batch_forecasting import (
+    MIN_ARIMA_OBSERVATIONS, forecast_segment_batch, random_walk_forecast
+)
+from repayment_models.npv_engine import Curves, NPVEngine
+from repayment_models.payment_patterns import debtor_payment_features
+from repayment_models.series_store import PaymentSeriesStore
+
 class RepaymentPredictor:
     def __init__(self):
         self.model = lgb.LGBMRegressor(
@@ -21,57 +32,235 @@ class RepaymentPredictor:
             'promises_kept_ratio',
             'income_category'
         ]
+        # Wytrenowany lub wczytany booster LightGBM do scoringu spraw
+        self.booster: Optional[lgb.Booster] = None
+        self.npv_engine = NPVEngine()
+
+    def _case_features(self, cases: pd.DataFrame) -> pd.DataFrame:
+        """Cechy sprawy; kategorie tekstowe przekazywane jako typ category."""
+        features = cases[self.feature_columns].copy()
+        for column in features.columns:
+            if features[column].dtype == object:
+                features[column] = features[column].astype('category')
+        return features
+
+    def train_repayment_model(self, cases: pd.DataFrame, y: np.ndarray) -> None:
+        """Trenowanie modelu oczekiwanej spłaty per sprawa."""
+        self.model.fit(self._case_features(cases), y)
+        self.booster = self.model.booster_
+
+    def save_repayment_model(self, path: str) -> None:
+        """Zapis modelu w natywnym formacie tekstowym LightGBM."""
+        if self.booster is None:
+            raise ValueError("Model spłat nie został wytrenowany")
+        self.booster.save_model(path)
+
+    def load_repayment_model(self, path: str) -> None:
+        """Wczytanie modelu z natywnego pliku LightGBM."""
+        self.booster = lgb.Booster(model_file=path)
+
+    def predict_repayments(self, cases: pd.DataFrame, num_threads: int = 0) -> np.ndarray:
+        """Wielowątkowa predykcja oczekiwanej spłaty (num_threads=0 - wszystkie rdzenie)."""
+        if self.booster is None:
+            raise ValueError("Model spłat nie został wytrenowany ani wczytany")
+        return self.booster.predict(self._case_features(cases), num_threads=num_threads)
+
+    def predict_repayments_chunked(self,
+                                   source: Union[str, object],
+                                   chunk_size: int = 500_000,
+                                   num_threads: int = 0,
+                                   id_column: str = 'case_id',
+                                   query: Optional[str] = None) -> Iterator[pd.DataFrame]:
+        """Scoring spraw czytanych porcjami z Parquet/CSV/SQL.
+
+        Zwraca kolejne porcje wyników (identyfikator sprawy i oczekiwana spłata),
+        więc pamięć zależy od rozmiaru porcji, a nie całego portfela.
+        """
+        columns = [id_column] + self.feature_columns
+        for chunk in read_portfolio_chunks(source, chunk_size, columns=columns, query=query):
+            yield pd.DataFrame({
+                id_column: chunk[id_column].to_numpy(),
+                'oczekiwana_spłata': self.predict_repayments(chunk, num_threads)
+            })
+
+    def prepare_time_series(self,
+                            historical_data: Union[pd.DataFrame, PaymentSeriesStore],
+                            segment_id: Optional[str] = None) -> pd.DataFrame:
+        """Przygotowanie szeregu czasowego spłat.
+
+        Z PaymentSeriesStore szereg czytany jest bez ponownej agregacji księgi
+        (całego portfela lub wskazanego segmentu).
+        """
+        if isinstance(historical_data, PaymentSeriesStore):
+            if segment_id is not None:
+                return historical_data.series(segment_id)
+            return historical_data.total_series()
 
-    def prepare_time_series(self, historical_data: pd.DataFrame) -> pd.DataFrame:
-        """Przygotowanie szeregu czasowego spłat."""
         ts_data = historical_data.groupby('date')['payment_amount'].sum().resample('M').sum()
         return ts_data.fillna(0)
 
-    def fit_arima_model(self, time_series: pd.Series) -> ARIMA:
-        """Dopasowanie modelu ARIMA do szeregu czasowego."""
+    def fit_arima_model(self,
+                        time_series: pd.Series,
+                        start_params: Optional[np.ndarray] = None) -> ARIMA:
+        """Dopasowanie modelu ARIMA do szeregu czasowego.
+
+        `start_params` (np. parametry z poprzedniego miesiąca) przyspieszają
+        zbieżność estymacji; przyrostowe odświeżanie zapewnia ARIMAStateStore.
+        """
         model = ARIMA(time_series, order=(1, 1, 1))
-        return model.fit()
+        return model.fit(start_params=start_params)
 
-    def predict_future_payments(self, 
-                              historical_data: pd.DataFrame, 
-                              forecast_periods: int = 12) -> Dict:
+    def predict_future_payments(self,
+                              historical_data: Union[pd.DataFrame, PaymentSeriesStore],
+                              forecast_periods: int = 12,
+                              segment_id: Optional[str] = None) -> Dict:
         """Predykcja przyszłych spłat."""
-        ts_data = self.prepare_time_series(historical_data)
+        ts_data = self.prepare_time_series(historical_data, segment_id)
         arima_model = self.fit_arima_model(ts_data)
-        forecast = arima_model.forecast(steps=forecast_periods)
-        
+        forecast = arima_model.get_forecast(forecast_periods)
+
         return {
-            'predicted_payments': forecast.values,
-            'confidence_intervals': arima_model.get_forecast(forecast_periods).conf_int()
+            'predicted_payments': forecast.predicted_mean.values,
+            'confidence_intervals': forecast.conf_int()
         }
 
-    def calculate_npv(self, 
-                     future_payments: np.ndarray, 
-                     discount_rate: float = 0.1) -> float:
-        """Obliczenie NPV dla przewidywanych spłat."""
-        periods = np.arange(1, len(future_payments) + 1)
-        npv = np.sum(future_payments / (1 + discount_rate) ** periods)
+    def forecast_segments(self,
+                          historical_data: pd.DataFrame,
+                          segment_columns: List[str],
+                          forecast_periods: int = 12,
+                          max_workers: Optional[int] = None,
+                          min_observations: int = MIN_ARIMA_OBSERVATIONS) -> pd.DataFrame:
+        """Prognozy spłat dla wielu segmentów (np. rocznik × sprzedawca × produkt).
+
+        Modele ARIMA dopasowywane są równolegle w procesach; szeregi krótkie
+        lub płaskie prognozowane są wektorowo błądzeniem losowym z dryfem.
+        Zwraca tabelę: segment, data, prognoza, granice przedziału, metoda
+        i czas obliczeń segmentu.
+        """
+        monthly = (historical_data
+                   .groupby(segment_columns + [pd.Grouper(key='date', freq='M')])['payment_amount']
+                   .sum()
+                   .unstack(fill_value=0))
+        months = pd.date_range(monthly.columns.min(), monthly.columns.max(), freq='M')
+        monthly = monthly.reindex(columns=months, fill_value=0)
+        values = monthly.to_numpy(dtype=float)
+        n_segments, n_months = values.shape
+
+        # Początek aktywności segmentu - wcześniejsze zera nie są obserwacjami
+        start = np.argmax(values != 0, axis=1)
+        active = np.arange(n_months)[None, :] >= start[:, None]
+        flat = (np.where(active, values, -np.inf).max(axis=1) ==
+                np.where(active, values, np.inf).min(axis=1))
+        use_arima = (n_months - start >= min_observations) & ~flat
+
+        forecast = np.empty((n_segments, forecast_periods))
+        lower = np.empty_like(forecast)
+        upper = np.empty_like(forecast)
+        method = np.full(n_segments, 'random_walk', dtype=object)
+        elapsed = np.zeros(n_segments)
+
+        arima_segments = [(i, values[i, start[i]:]) for i in np.flatnonzero(use_arima)]
+        for result in self._run_segment_batches(arima_segments, forecast_periods, max_workers):
+            i = result['segment_id']
+            elapsed[i] = result['elapsed']
+            if result['method'] == 'arima':
+                forecast[i], lower[i], upper[i] = result['forecast'], result['lower'], result['upper']
+                method[i] = 'arima'
+            else:
+                use_arima[i] = False
+
+        fallback = np.flatnonzero(~use_arima)
+        if len(fallback):
+            fallback_start = time.perf_counter()
+            forecast[fallback], lower[fallback], upper[fallback] = random_walk_forecast(
+                values[fallback], forecast_periods, start[fallback]
+            )
+            elapsed[fallback] += (time.perf_counter() - fallback_start) / len(fallback)
+
+        forecast_dates = pd.date_range(months[-1], periods=forecast_periods + 1, freq='M')[1:]
+        result = monthly.index.to_frame(index=False).loc[
+            np.repeat(np.arange(n_segments), forecast_periods)
+        ].reset_index(drop=True)
+        result['date'] = np.tile(forecast_dates, n_segments)
+        result['prognoza'] = forecast.ravel()
+        result['dolna_granica'] = lower.ravel()
+        result['górna_granica'] = upper.ravel()
+        result['metoda'] = np.repeat(method, forecast_periods)
+        result['czas_s'] = np.repeat(elapsed, forecast_periods)
+        return result
+
+    def _run_segment_batches(self,
+                             segments: List,
+                             forecast_periods: int,
+                             max_workers: Optional[int]) -> List[Dict]:
+        """Dopasowanie ARIMA dla segmentów - w procesach lub lokalnie dla jednego procesu."""
+        max_workers = max_workers or os.cpu_count() or 1
+        if not segments:
+            return []
+        if max_workers == 1:
+            return forecast_segment_batch(segments, forecast_periods)
+
+        n_batches = min(len(segments), max_workers * 4)
+        batches = [segments[i::n_batches] for i in range(n_batches)]
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(forecast_segment_batch, batches,
+                                   [forecast_periods] * n_batches)
+            return [item for batch in results for item in batch]
+
+    def calculate_npv(self,
+                     future_payments: np.ndarray,
+                     discount_rate: Curves = 0.1) -> Union[float, np.ndarray]:
+        """Obliczenie NPV dla przewidywanych spłat.
+
+        Dla wektora spłat i jednej stopy zwraca liczbę; dla macierzy
+        (sprawy × okresy) lub wielu krzywych - macierz NPV (sprawy × krzywe).
+        """
+        npv = self.npv_engine.npv(future_payments, discount_rate)
+        if np.ndim(future_payments) == 1 and npv.shape[1] == 1:
+            return float(npv[0, 0])
         return npv
 
-    def analyze_payment_patterns(self, historical_data: pd.DataFrame) -> Dict:
-        """Analiza wzorców spłat."""
+    def analyze_payment_patterns(self,
+                                 historical_data: pd.DataFrame,
+                                 debtor_column: str = 'debtor_id') -> Dict:
+        """Analiza wzorców spłat.
+
+        Dla księgi wielu dłużników regularność to średnia regularności
+        poszczególnych dłużników (odstępy liczone w obrębie dłużnika).
+        """
+        payment_dates = pd.to_datetime(historical_data['payment_date'])
+
+        if debtor_column in historical_data.columns:
+            # Daty sparsowane powyżej - bez drugiego parsowania całej księgi
+            features = self.analyze_debtor_patterns(historical_data, debtor_column, payment_dates)
+            with_intervals = features[features['liczba_spłat'] > 2]
+            regularity = with_intervals['regularność_spłat'].mean() if len(with_intervals) else 0
+        else:
+            regularity = self._calculate_payment_regularity(payment_dates)
+
         patterns = {
             'średnia_spłata': historical_data['payment_amount'].mean(),
             'mediana_spłat': historical_data['payment_amount'].median(),
-            'regularność_spłat': self._calculate_payment_regularity(historical_data),
-            'sezonowość': self._detect_seasonality(historical_data)
+            'regularność_spłat': regularity,
+            'sezonowość': self._detect_seasonality(historical_data, payment_dates)
         }
         return patterns
 
-    def _calculate_payment_regularity(self, data: pd.DataFrame) -> float:
+    def analyze_debtor_patterns(self,
+                                ledger: pd.DataFrame,
+                                debtor_column: str = 'debtor_id',
+                                payment_dates: Optional[pd.Series] = None) -> pd.DataFrame:
+        """Tabela cech wzorców spłat per dłużnik (do wykorzystania w scoringu)."""
+        return debtor_payment_features(ledger, debtor_column, payment_dates=payment_dates)
+
+    def _calculate_payment_regularity(self, payment_dates: pd.Series) -> float:
         """Obliczenie wskaźnika regularności spłat."""
-        payment_dates = pd.to_datetime(data['payment_date'])
-        intervals = payment_dates.diff().dt.days
+        intervals = payment_dates.sort_values().diff().dt.days
         return 1 - (intervals.std() / intervals.mean()) if len(intervals) > 1 else 0
 
-    def _detect_seasonality(self, data: pd.DataFrame) -> Dict:
+    def _detect_seasonality(self, data: pd.DataFrame, payment_dates: pd.Series) -> Dict:
         """Wykrywanie sezonowości w spłatach."""
-        monthly_payments = data.groupby(pd.to_datetime(data['payment_date']).dt.month)['payment_amount'].mean()
+        monthly_payments = data['payment_amount'].groupby(payment_dates.dt.month).mean()
         return {
             'month': monthly_payments.idxmax(),
             'relative_strength': monthly_payments.max() / monthly_payments.mean()
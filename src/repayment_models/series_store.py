@@ -0,0 +1,126 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+
+def _month_number(dates: pd.Series) -> np.ndarray:
+    """Numer miesiąca liczony od 1970-01 (kolumna macierzy szeregów)."""
+    return pd.to_datetime(dates).to_numpy().astype('datetime64[M]').astype(np.int64)
+
+
+class PaymentSeriesStore:
+    """Magazyn miesięcznych szeregów spłat per segment mapowany z dysku.
+
+    Spłaty przechowywane są jako zagregowana macierz (segmenty × miesiące)
+    w pliku .npy otwieranym przez `np.memmap`, z indeksem segmentów w JSON.
+    Nowe spłaty dodawane są przyrostowo - agregowana jest tylko nowa porcja,
+    a odczyt szeregu segmentu kosztuje O(liczba miesięcy).
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.values_path = os.path.join(directory, 'values.npy')
+        self.index_path = os.path.join(directory, 'index.json')
+        os.makedirs(directory, exist_ok=True)
+
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding='utf-8') as f:
+                index = json.load(f)
+            self.segments: List[str] = index['segments']
+            self.first_month: Optional[int] = index['first_month']
+            self.n_months: int = index['n_months']
+            self.values = np.load(self.values_path, mmap_mode='r+')
+        else:
+            self.segments = []
+            self.first_month = None
+            self.n_months = 0
+            self.values = None
+
+        self.positions: Dict[str, int] = {segment: i for i, segment in enumerate(self.segments)}
+
+    def _save_index(self) -> None:
+        with open(self.index_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'segments': self.segments,
+                       'first_month': self.first_month,
+                       'n_months': self.n_months}, f)
+        os.replace(self.index_path + '.tmp', self.index_path)
+
+    def _ensure_capacity(self, n_rows: int, first_month: int, last_month: int) -> None:
+        """Powiększenie macierzy (z zapasem) gdy brakuje wierszy lub miesięcy."""
+        if self.first_month is None:
+            self.first_month = first_month
+        shift = max(0, self.first_month - first_month)
+        n_months = max(self.n_months + shift, last_month - min(first_month, self.first_month) + 1)
+
+        rows, columns = self.values.shape if self.values is not None else (0, 0)
+        if n_rows <= rows and n_months <= columns and shift == 0:
+            self.n_months = n_months
+            return
+
+        # Podwajanie pojemności - koszt przebudowy amortyzuje się w kolejnych aktualizacjach
+        new_shape = (max(n_rows, 2 * rows, 16), max(n_months, 2 * columns, 12))
+        tmp_path = self.values_path + '.tmp.npy'
+        resized = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float64, shape=new_shape)
+        resized[:] = 0
+        if self.values is not None:
+            resized[:rows, shift:shift + self.n_months] = self.values[:rows, :self.n_months]
+        resized.flush()
+        del resized
+        self.values = None
+        os.replace(tmp_path, self.values_path)
+
+        self.values = np.load(self.values_path, mmap_mode='r+')
+        self.first_month = min(first_month, self.first_month)
+        self.n_months = n_months
+
+    def update(self,
+               payments: pd.DataFrame,
+               segment_column: str = 'segment_id',
+               date_column: str = 'date',
+               amount_column: str = 'payment_amount') -> None:
+        """Dodanie nowych spłat - agregacja tylko nowej porcji danych."""
+        if payments.empty:
+            return
+
+        months = _month_number(payments[date_column])
+        delta = (pd.DataFrame({'segment': payments[segment_column].astype(str).to_numpy(),
+                               'month': months,
+                               'amount': payments[amount_column].to_numpy(dtype=float)})
+                 .groupby(['segment', 'month'], sort=False)['amount'].sum())
+
+        for segment in delta.index.get_level_values('segment').unique():
+            if segment not in self.positions:
+                self.positions[segment] = len(self.segments)
+                self.segments.append(segment)
+
+        self._ensure_capacity(len(self.segments), int(months.min()), int(months.max()))
+
+        rows = np.array([self.positions[s] for s in delta.index.get_level_values('segment')])
+        columns = delta.index.get_level_values('month').to_numpy() - self.first_month
+        np.add.at(self.values, (rows, columns), delta.to_numpy())
+        self.values.flush()
+        self._save_index()
+
+    def _dates(self) -> pd.DatetimeIndex:
+        start = pd.Period(np.datetime64(self.first_month, 'M'), freq='M')
+        return pd.period_range(start, periods=self.n_months, freq='M').to_timestamp(how='end').normalize()
+
+    def series(self, segment_id) -> pd.Series:
+        """Miesięczny szereg spłat segmentu."""
+        row = self.positions[str(segment_id)]
+        return pd.Series(np.array(self.values[row, :self.n_months]), index=self._dates(),
+                         name='payment_amount')
+
+    def total_series(self) -> pd.Series:
+        """Miesięczny szereg spłat całego portfela."""
+        totals = np.asarray(self.values[:len(self.segments), :self.n_months]).sum(axis=0)
+        return pd.Series(totals, index=self._dates(), name='payment_amount')
+
+    def to_frame(self, segments: Optional[List] = None) -> pd.DataFrame:
+        """Macierz szeregów (segmenty × miesiące) dla wybranych segmentów."""
+        segments = [str(s) for s in segments] if segments is not None else self.segments
+        rows = [self.positions[s] for s in segments]
+        return pd.DataFrame(np.asarray(self.values[rows, :self.n_months]),
+                            index=segments, columns=self._dates())
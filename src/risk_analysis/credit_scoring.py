@@ -1,13 +1,29 @@
+import os
 import numpy as np
 import pandas as pd
+import joblib
+import sklearn
+from datetime import datetime
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.exceptions import NotFittedError
 from sklearn.preprocessing import StandardScaler
-from typing import Dict, List, Tuple, Optional
+from sklearn.utils.validation import check_is_fitted
+from typing import Dict, Iterable, List, Tuple, Optional
+
+from common.data_sources import read_portfolio_chunks
+from risk_analysis.forest_inference import CompiledForest
+from risk_analysis.streaming import ScoreAccumulator
+
+# Wersja formatu zapisanego modelu - zmiana wymaga ponownego treningu
+ARTIFACT_VERSION = 3
 
 class CreditScoring:
     def __init__(self):
         self.model = RandomForestClassifier(n_estimators=100, random_state=42)
         self.scaler = StandardScaler()
+        # Skompilowany las dla małych partii (np. pojedynczy wniosek w API)
+        self.compiled_model: Optional[CompiledForest] = None
+        self.compiled_max_batch = 256
         self.feature_columns = [
             'income',
             'debt_ratio',
@@ -16,65 +32,178 @@ class CreditScoring:
             'num_defaults',
             'employment_length'
         ]
+        self.risk_categories = [
+            "Niskie ryzyko",
+            "Średnio-niskie ryzyko",
+            "Średnie ryzyko",
+            "Średnio-wysokie ryzyko",
+            "Wysokie ryzyko"
+        ]
+        # Dolne granice score'u dla kolejnych kategorii (od drugiej)
+        self.category_thresholds = np.array([0.2, 0.4, 0.6, 0.8])
 
-    def prepare_features(self, data: pd.DataFrame) -> np.ndarray:
-        """Przygotowanie cech do modelu."""
+    def prepare_features(self, data: pd.DataFrame, fit: bool = False) -> np.ndarray:
+        """Przygotowanie cech do modelu.
+
+        Skaler uczony jest tylko przy fit=True; w pozostałych przypadkach
+        używany jest wcześniej dopasowany stan, niezależny od składu partii.
+        """
         features = data[self.feature_columns].copy()
-        return self.scaler.fit_transform(features)
+        if fit:
+            return self.scaler.fit_transform(features)
+
+        try:
+            check_is_fitted(self.scaler)
+        except NotFittedError:
+            raise ValueError("Skaler nie został dopasowany - użyj fit lub load_model")
+        return self.scaler.transform(features)
 
     def train_model(self, X: np.ndarray, y: np.ndarray) -> None:
         """Trenowanie modelu scoringowego."""
         self.model.fit(X, y)
+        self.compiled_model = None
+
+    def compile_model(self) -> None:
+        """Kompilacja lasu do płaskich tablic dla szybkiej predykcji małych partii."""
+        check_is_fitted(self.model)
+        self.compiled_model = CompiledForest.from_sklearn(self.model)
+
+    def fit(self, data: pd.DataFrame, y: np.ndarray) -> None:
+        """Dopasowanie skalera i modelu na danych treningowych."""
+        X = self.prepare_features(data, fit=True)
+        self.train_model(X, y)
+
+    def save_model(self, path: str) -> None:
+        """Zapis dopasowanego skalera i modelu jako wersjonowanego artefaktu.
+
+        Obok pliku `path` tworzony jest katalog `path.forest` z lasem
+        skompilowanym do płaskich tablic .npy (mapowanych przy wczytaniu)
+        oraz pełnym estymatorem sklearn.
+        """
+        check_is_fitted(self.model)
+        forest_dir = f"{path}.forest"
+        (self.compiled_model or CompiledForest.from_sklearn(self.model)).save(forest_dir)
+        joblib.dump(self.model, os.path.join(forest_dir, 'estimator.joblib'))
+
+        artifact = {
+            'artifact_version': ARTIFACT_VERSION,
+            'sklearn_version': sklearn.__version__,
+            'created_at': datetime.now().isoformat(),
+            'feature_columns': self.feature_columns,
+            'scaler': self.scaler
+        }
+        joblib.dump(artifact, path)
+
+    def load_model(self, path: str, mmap_mode: Optional[str] = 'r') -> Dict:
+        """Wczytanie artefaktu modelu.
+
+        Estymator sklearn ocenia duże partie, a skompilowany las z tablic .npy
+        mapowanych z dysku (`mmap_mode`) - małe partie, bez kompilacji przy
+        starcie procesu. Wczytany model można ponownie zapisać i skompilować.
+        """
+        artifact = joblib.load(path)
+
+        if artifact.get('artifact_version') != ARTIFACT_VERSION:
+            raise ValueError(f"Nieobsługiwana wersja artefaktu: {artifact.get('artifact_version')}")
+
+        forest_dir = f"{path}.forest"
+        self.feature_columns = artifact['feature_columns']
+        self.scaler = artifact['scaler']
+        self.model = joblib.load(os.path.join(forest_dir, 'estimator.joblib'))
+        self.compiled_model = CompiledForest.load(forest_dir, mmap_mode=mmap_mode)
+        return {key: artifact[key] for key in ('artifact_version', 'sklearn_version', 'created_at')}
 
     def predict_risk_score(self, features: np.ndarray) -> np.ndarray:
         """Predykcja score'u ryzyka."""
+        # Dla dużych partii zoptymalizowana predykcja sklearn jest szybsza
+        if self.compiled_model is not None and len(features) <= self.compiled_max_batch:
+            if len(features) == 1:
+                return np.array([self.compiled_model.predict_one(features[0])])
+            return self.compiled_model.predict(features)
+
         probabilities = self.model.predict_proba(features)
         return probabilities[:, 1]  # Prawdopodobieństwo defaultu
 
     def calculate_risk_category(self, score: float) -> str:
         """Określenie kategorii ryzyka na podstawie score'u."""
-        if score < 0.2:
-            return "Niskie ryzyko"
-        elif score < 0.4:
-            return "Średnio-niskie ryzyko"
-        elif score < 0.6:
-            return "Średnie ryzyko"
-        elif score < 0.8:
-            return "Średnio-wysokie ryzyko"
-        else:
-            return "Wysokie ryzyko"
+        return self.risk_categories[int(np.digitize(score, self.category_thresholds))]
+
+    def categorize_scores(self, scores: np.ndarray) -> np.ndarray:
+        """Wektorowe przypisanie indeksów kategorii ryzyka."""
+        return np.digitize(scores, self.category_thresholds)
 
     def evaluate_portfolio(self, portfolio: pd.DataFrame) -> Dict:
         """Ocena całego portfela."""
         features = self.prepare_features(portfolio)
         scores = self.predict_risk_score(features)
-        
-        return {
-            'średni_score': np.mean(scores),
-            'mediana_score': np.median(scores),
-            'rozkład_kategorii': {
-                cat: np.sum([self.calculate_risk_category(s) == cat for s in scores])
-                for cat in ["Niskie ryzyko", "Średnio-niskie ryzyko", "Średnie ryzyko", 
-                          "Średnio-wysokie ryzyko", "Wysokie ryzyko"]
-            }
-        }
+
+        return self._summarize_scores(scores)
 
     def generate_risk_report(self, portfolio: pd.DataFrame) -> Dict:
         """Generowanie raportu ryzyka."""
-        eval_results = self.evaluate_portfolio(portfolio)
         features = self.prepare_features(portfolio)
         scores = self.predict_risk_score(features)
 
+        # Score'y liczone raz i współdzielone przez wszystkie sekcje raportu
+        eval_results = self._summarize_scores(scores)
+
         return {
             'podsumowanie_portfela': eval_results,
             'wskaźniki_ryzyka': {
                 'var_95': np.percentile(scores, 95),
-                'expected_loss': np.mean(scores) * portfolio['amount'].sum(),
+                'expected_loss': eval_results['średni_score'] * portfolio['amount'].sum(),
                 'risk_concentration': np.sum(scores > 0.8) / len(scores)
             },
             'rekomendacje': self._generate_recommendations(eval_results)
         }
 
+    def accumulate_scores(self, chunks: Iterable[pd.DataFrame]) -> ScoreAccumulator:
+        """Scoring portfela porcja po porcji dopasowanym modelem."""
+        accumulator = ScoreAccumulator(self.category_thresholds)
+
+        for chunk in chunks:
+            scores = self.predict_risk_score(self.prepare_features(chunk))
+            accumulator.update(scores, chunk['amount'].to_numpy())
+
+        return accumulator
+
+    def generate_risk_report_streaming(self,
+                                       source,
+                                       chunk_size: int = 100_000,
+                                       query: Optional[str] = None) -> Dict:
+        """Raport ryzyka dla portfela czytanego porcjami z Parquet/CSV/SQL.
+
+        Pamięć ograniczona jest rozmiarem porcji; mediana i VaR pochodzą
+        ze szkicu kwantyli, pozostałe statystyki są dokładne.
+        """
+        chunks = read_portfolio_chunks(source, chunk_size,
+                                       columns=self.feature_columns + ['amount'],
+                                       query=query)
+        accumulator = self.accumulate_scores(chunks)
+
+        eval_results = {
+            'średni_score': accumulator.mean_score,
+            'mediana_score': accumulator.quantile(0.5),
+            'rozkład_kategorii': dict(zip(self.risk_categories, accumulator.category_counts))
+        }
+
+        return {
+            'podsumowanie_portfela': eval_results,
+            'wskaźniki_ryzyka': accumulator.risk_indicators(),
+            'rekomendacje': self._generate_recommendations(eval_results)
+        }
+
+    def _summarize_scores(self, scores: np.ndarray) -> Dict:
+        """Podsumowanie portfela na podstawie wyliczonych score'ów."""
+        counts = np.bincount(self.categorize_scores(scores),
+                             minlength=len(self.risk_categories))
+
+        return {
+            'średni_score': np.mean(scores),
+            'mediana_score': np.median(scores),
+            'rozkład_kategorii': dict(zip(self.risk_categories, counts))
+        }
+
     def _generate_recommendations(self, eval_results: Dict) -> List[str]:
         """Generowanie rekomendacji na podstawie wyników."""
         recommendations = []
@@ -0,0 +1,229 @@
+import json
+import os
+import time
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from typing import Optional
+
+
+class CompiledForest:
+    """Las drzew skompilowany do płaskich tablic węzłów numpy.
+
+    Każdy węzeł zajmuje dwie sąsiednie pozycje (lewe i prawe dziecko), więc
+    krok w dół drzewa to jedno indeksowanie `children[node + go_right]`
+    bez mnożenia indeksów. Cecha, próg i wartość liścia są powielone na obie
+    pozycje, a liście wskazują same na siebie - pętla po głębokości nie
+    wymaga osobnej obsługi zakończonych ścieżek.
+
+    Progi przeliczane są przy kompilacji tak, aby porównanie w float64
+    dawało ten sam wynik co porównanie sklearn w precyzji float32 - wejście
+    nie jest kopiowane przy każdym wywołaniu.
+
+    Tablice można zapisać jako pliki .npy (`save`) i wczytać mapowane
+    z dysku (`load`) - procesy scoringowe współdzielą wtedy strony pamięci
+    modelu zamiast trzymać każdy własną kopię drzew.
+    """
+
+    ARRAYS = ('feature', 'threshold', 'children', 'value', 'roots', 'depths')
+
+    # Do tylu wierszy wszystkie drzewa przechodzone są poziomami naraz;
+    # większe partie liczone są drzewo po drzewie w blokach wierszy
+    LEVELWISE_MAX_ROWS = 512
+    BLOCK_ROWS = 16384
+
+    def __init__(self,
+                 feature: np.ndarray,
+                 threshold: np.ndarray,
+                 children: np.ndarray,
+                 value: np.ndarray,
+                 roots: np.ndarray,
+                 depths: np.ndarray):
+        self.feature = feature
+        self.threshold = threshold
+        # Pozycja węzła i to 2 * i; children[2 * i] - lewe, children[2 * i + 1] - prawe
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.depths = depths
+        self.max_depth = int(depths.max())
+
+    @classmethod
+    def from_sklearn(cls, model: RandomForestClassifier, positive_class: int = 1) -> 'CompiledForest':
+        """Kompilacja wytrenowanego RandomForestClassifier."""
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+
+            left = np.where(is_leaf, nodes, tree.children_left) + offset
+            right = np.where(is_leaf, nodes, tree.children_right) + offset
+            class_values = tree.value[:, 0, :]
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            children.append(2 * np.column_stack([left, right]).ravel())
+            values.append(class_values[:, positive_class] / class_values.sum(axis=1))
+            roots.append(2 * offset)
+            offset += tree.node_count
+
+        return cls(
+            feature=np.repeat(np.concatenate(features), 2).astype(np.intp),
+            threshold=np.repeat(_float32_split_thresholds(np.concatenate(thresholds)), 2),
+            children=np.concatenate(children).astype(np.intp),
+            value=np.repeat(np.concatenate(values), 2),
+            roots=np.array(roots, dtype=np.intp),
+            depths=np.array([estimator.tree_.max_depth for estimator in model.estimators_], dtype=np.intp)
+        )
+
+    def save(self, directory: str) -> None:
+        """Zapis tablic lasu jako plików .npy (do wczytania z mmap)."""
+        os.makedirs(directory, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(directory, 'forest.json'), 'w') as f:
+            json.dump({'max_depth': self.max_depth}, f)
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Optional[str] = 'r') -> 'CompiledForest':
+        """Wczytanie lasu zapisanego przez `save`; przy mmap_mode tablice mapowane są z dysku."""
+        # np.asarray zdejmuje podklasę memmap (bez kopiowania) - szybsze indeksowanie
+        arrays = {name: np.asarray(np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode))
+                  for name in cls.ARRAYS}
+        return cls(**arrays)
+
+    def predict_one(self, x: np.ndarray) -> float:
+        """Prawdopodobieństwo klasy pozytywnej dla pojedynczego wiersza."""
+        x = np.asarray(x, dtype=np.float64).ravel()
+        feature, threshold, children = self.feature, self.threshold, self.children
+        node = self.roots
+
+        for depth in range(self.max_depth):
+            next_node = children[node + (x[feature[node]] > threshold[node])]
+            # Co 4 poziomy: koniec, gdy wszystkie ścieżki stały już w liściach
+            if depth & 3 == 3 and (next_node == node).all():
+                break
+            node = next_node
+
+        return float(self.value[node].sum()) / len(node)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Prawdopodobieństwo klasy pozytywnej dla partii wierszy."""
+        X = np.asarray(X, dtype=np.float64)
+        if len(X) <= self.LEVELWISE_MAX_ROWS:
+            return self._predict_levelwise(X)
+
+        return np.concatenate([
+            self._predict_by_tree(X[start:start + self.BLOCK_ROWS])
+            for start in range(0, len(X), self.BLOCK_ROWS)
+        ])
+
+    def _predict_levelwise(self, X: np.ndarray) -> np.ndarray:
+        """Małe partie: wszystkie pary (wiersz, drzewo) przechodzone poziomami naraz.
+
+        Co 8 poziomów pary, które doszły już do liścia, są usuwane z pętli.
+        """
+        n_rows, n_features = X.shape
+        n_trees = len(self.roots)
+        feature, threshold, children = self.feature, self.threshold, self.children
+        flat_X = np.ascontiguousarray(X).ravel()
+
+        node = np.tile(self.roots, n_rows)
+        row_offset = np.repeat(np.arange(n_rows) * n_features, n_trees)
+        position = np.arange(n_rows * n_trees)
+        leaves = np.empty(n_rows * n_trees, dtype=np.intp)
+
+        for depth in range(self.max_depth):
+            next_node = children[node + (flat_X[row_offset + feature[node]] > threshold[node])]
+            if depth & 7 == 7:
+                moving = next_node != node
+                finished = ~moving
+                leaves[position[finished]] = next_node[finished]
+                next_node, row_offset, position = next_node[moving], row_offset[moving], position[moving]
+            node = next_node
+        leaves[position] = node
+
+        return self.value[leaves].reshape(n_rows, n_trees).sum(axis=1) / n_trees
+
+    def _predict_by_tree(self, X: np.ndarray) -> np.ndarray:
+        """Duże partie: drzewo po drzewie dla wszystkich wierszy bloku.
+
+        Tablice robocze mają rozmiar bloku wierszy, a dane węzłów jednego
+        drzewa mieszczą się w pamięci podręcznej procesora. Co 8 poziomów
+        wiersze, które doszły już do liścia, są usuwane z pętli.
+        """
+        n_rows = len(X)
+        feature, threshold, children, value = self.feature, self.threshold, self.children, self.value
+        # Cechy kolejno w pamięci: wartość cechy f wiersza r to X_t[f * n_rows + r]
+        X_t = np.ascontiguousarray(X.T).ravel()
+        feature_offset = feature * n_rows
+        all_rows = np.arange(n_rows)
+        total = np.zeros(n_rows)
+
+        for root, depth in zip(self.roots.tolist(), self.depths.tolist()):
+            node = np.full(n_rows, root)
+            rows = all_rows
+            for level in range(depth):
+                next_node = children[node + (X_t[feature_offset[node] + rows] > threshold[node])]
+                if level & 7 == 7:
+                    moving = next_node != node
+                    finished = ~moving
+                    total[rows[finished]] += value[next_node[finished]]
+                    next_node, rows = next_node[moving], rows[moving]
+                node = next_node
+            total[rows] += value[node]
+
+        return total / len(self.roots)
+
+
+def _float32_split_thresholds(threshold: np.ndarray) -> np.ndarray:
+    """Progi t' takie, że x > t' (float64) wtedy i tylko wtedy, gdy float32(x) > t.
+
+    sklearn porównuje cechy zrzutowane do float32. float32(x) > t oznacza
+    float32(x) >= s, gdzie s to najmniejszy float32 większy od t, a to
+    zachodzi dla x powyżej połowy odległości między s i jego poprzednikiem
+    (w połowie - gdy zaokrąglenie do parzystej wybiera s).
+    """
+    with np.errstate(over='ignore', invalid='ignore'):
+        nearest = threshold.astype(np.float32)
+        upper = np.where(nearest.astype(np.float64) > threshold,
+                         nearest, np.nextafter(nearest, np.float32(np.inf)))
+        lower = np.nextafter(upper, np.float32(-np.inf))
+        midpoint = (upper.astype(np.float64) + lower.astype(np.float64)) / 2
+        split = np.where(midpoint.astype(np.float32) == upper, np.nextafter(midpoint, -np.inf), midpoint)
+    return np.where(np.isfinite(threshold), split, threshold)
+
+
+def benchmark(n_train: int = 5000, n_features: int = 6, repeats: int = 200) -> dict:
+    """Porównanie czasu predykcji sklearn i skompilowanego lasu."""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(n_train, n_features))
+    y = (X[:, 0] + rng.normal(size=n_train) > 0).astype(int)
+
+    model = RandomForestClassifier(n_estimators=100, random_state=42).fit(X, y)
+    compiled = CompiledForest.from_sklearn(model)
+    row = X[:1]
+
+    def timed(func, arg, n):
+        start = time.perf_counter()
+        for _ in range(n):
+            func(arg)
+        return (time.perf_counter() - start) / n
+
+    return {
+        'max_abs_diff': float(np.max(np.abs(model.predict_proba(X)[:, 1] - compiled.predict(X)))),
+        'sklearn_single_us': timed(model.predict_proba, row, repeats) * 1e6,
+        'compiled_single_us': timed(compiled.predict_one, row[0], repeats) * 1e6,
+        'sklearn_batch_64_ms': timed(model.predict_proba, X[:64], 20) * 1e3,
+        'compiled_batch_64_ms': timed(compiled.predict, X[:64], 20) * 1e3,
+        'sklearn_batch_ms': timed(model.predict_proba, X, 5) * 1e3,
+        'compiled_batch_ms': timed(compiled.predict, X, 5) * 1e3
+    }
+
+
+# Benchmark inferencji
+if __name__ == "__main__":
+    for key, value in benchmark().items():
+        print(f"{key}: {value:.4g}")
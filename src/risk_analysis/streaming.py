@@ -0,0 +1,59 @@
+import numpy as np
+from typing import Dict
+
+from common.quantile_sketch import QuantileSketch
+
+
+class ScoreAccumulator:
+    """Przyrostowe statystyki raportu ryzyka liczone porcjami.
+
+    Pamięć zależy tylko od liczby kategorii i przedziałów szkicu kwantyli,
+    a akumulatory z wielu procesów można scalać metodą `merge`.
+    """
+
+    def __init__(self, category_thresholds: np.ndarray, sketch_bins: int = 10000):
+        self.category_thresholds = np.asarray(category_thresholds)
+        self.count = 0
+        self.score_sum = 0.0
+        self.amount_sum = 0.0
+        self.high_risk_count = 0
+        self.category_counts = np.zeros(len(self.category_thresholds) + 1, dtype=np.int64)
+        self.sketch = QuantileSketch(0.0, 1.0, bins=sketch_bins)
+
+    def update(self, scores: np.ndarray, amounts: np.ndarray) -> None:
+        """Dodanie score'ów i kwot kolejnej porcji portfela."""
+        self.count += len(scores)
+        self.score_sum += float(np.sum(scores))
+        self.amount_sum += float(np.sum(amounts))
+        self.high_risk_count += int(np.sum(scores > 0.8))
+        self.category_counts += np.bincount(
+            np.digitize(scores, self.category_thresholds),
+            minlength=len(self.category_counts)
+        )
+        self.sketch.update(scores)
+
+    def merge(self, other: 'ScoreAccumulator') -> 'ScoreAccumulator':
+        """Scalenie z akumulatorem innej części portfela."""
+        self.count += other.count
+        self.score_sum += other.score_sum
+        self.amount_sum += other.amount_sum
+        self.high_risk_count += other.high_risk_count
+        self.category_counts += other.category_counts
+        self.sketch.merge(other.sketch)
+        return self
+
+    @property
+    def mean_score(self) -> float:
+        return self.score_sum / self.count if self.count else np.nan
+
+    def quantile(self, q: float) -> float:
+        """Przybliżony kwantyl score'u (dokładność 1 / sketch_bins)."""
+        return float(self.sketch.quantile(q)[0])
+
+    def risk_indicators(self) -> Dict:
+        """Wskaźniki ryzyka w formacie raportu CreditScoring."""
+        return {
+            'var_95': self.quantile(0.95),
+            'expected_loss': self.mean_score * self.amount_sum,
+            'risk_concentration': self.high_risk_count / self.count if self.count else np.nan
+        }
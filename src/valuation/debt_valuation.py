@@ -1,8 +1,11 @@
 import numpy as np
 import pandas as pd
+import joblib
 from typing import Dict, List, Optional
 from sklearn.ensemble import GradientBoostingRegressor
 
+from valuation.monte_carlo import MonteCarloEngine
+
 class DebtValuation:
     def __init__(self):
         self.model = GradientBoostingRegressor(
@@ -10,6 +13,8 @@ class DebtValuation:
             learning_rate=0.1,
             max_depth=3
         )
+        self.recovery_features = ['debt_amount', 'age', 'risk_score']
+        self.is_fitted = False
         self.risk_weights = {
             'Niskie ryzyko': 1.0,
             'Średnio-niskie ryzyko': 0.8,
@@ -17,6 +22,12 @@ class DebtValuation:
             'Średnio-wysokie ryzyko': 0.4,
             'Wysokie ryzyko': 0.2
         }
+        # Wrażliwość wartości długu na czynniki rynkowe
+        self.market_sensitivities = {
+            'interest_rate': -0.1,
+            'unemployment_rate': -0.05,
+            'gdp_growth': 0.1
+        }
 
     def calculate_base_value(self, 
                            debt_amount: float,
@@ -32,50 +43,68 @@ class DebtValuation:
                                    market_factors: Dict[str, float]) -> float:
         """Korekta wartości o czynniki rynkowe."""
         market_multiplier = 1.0
-        
-        if 'interest_rate' in market_factors:
-            market_multiplier *= (1 - market_factors['interest_rate'] * 0.1)
-        
-        if 'unemployment_rate' in market_factors:
-            market_multiplier *= (1 - market_factors['unemployment_rate'] * 0.05)
-            
-        if 'gdp_growth' in market_factors:
-            market_multiplier *= (1 + market_factors['gdp_growth'] * 0.1)
-            
+
+        for factor, sensitivity in self.market_sensitivities.items():
+            if factor in market_factors:
+                market_multiplier *= (1 + market_factors[factor] * sensitivity)
+
         return base_value * market_multiplier
 
+    def fit_recovery_model(self, historical_data: pd.DataFrame) -> None:
+        """Jednorazowe trenowanie modelu odzysku na danych historycznych."""
+        X = historical_data[self.recovery_features]
+        y = historical_data['recovered']
+
+        self.model.fit(X, y)
+        self.is_fitted = True
+
+    def save_recovery_model(self, path: str) -> None:
+        """Zapis wytrenowanego modelu odzysku na dysk."""
+        if not self.is_fitted:
+            raise ValueError("Model odzysku nie został wytrenowany")
+        joblib.dump({'model': self.model, 'features': self.recovery_features}, path)
+
+    def load_recovery_model(self, path: str) -> None:
+        """Wczytanie wytrenowanego modelu odzysku z dysku."""
+        artifact = joblib.load(path)
+        self.model = artifact['model']
+        self.recovery_features = artifact['features']
+        self.is_fitted = True
+
+    def predict_recovery_probabilities(self, debts: pd.DataFrame) -> np.ndarray:
+        """Wektorowa predykcja prawdopodobieństwa odzysku dla portfela długów."""
+        if not self.is_fitted:
+            raise ValueError("Model odzysku nie został wytrenowany - użyj fit_recovery_model")
+
+        predictions = self.model.predict(debts[self.recovery_features])
+        # Regresor może wyjść poza przedział [0, 1]
+        return np.clip(predictions, 0.0, 1.0)
+
     def calculate_recovery_probability(self,
                                     debt_features: Dict[str, float],
-                                    historical_data: pd.DataFrame) -> float:
+                                    historical_data: Optional[pd.DataFrame] = None) -> float:
         """Obliczenie prawdopodobieństwa odzysku."""
-        X = historical_data[['debt_amount', 'age', 'risk_score']]
-        y = historical_data['recovered']
-        
-        self.model.fit(X, y)
-        
-        features = np.array([[
-            debt_features['debt_amount'],
-            debt_features['age'],
-            debt_features['risk_score']
-        ]])
-        
-        return self.model.predict_proba(features)[0][1]
+        if not self.is_fitted:
+            if historical_data is None:
+                raise ValueError("Brak wytrenowanego modelu i danych historycznych")
+            self.fit_recovery_model(historical_data)
+
+        features = pd.DataFrame([{
+            column: debt_features[column] for column in self.recovery_features
+        }])
+
+        return float(self.predict_recovery_probabilities(features)[0])
 
     def simulate_scenarios(self,
                          base_value: float,
                          recovery_prob: float,
-                         num_scenarios: int = 1000) -> Dict:
+                         num_scenarios: int = 1000,
+                         seed: Optional[int] = None) -> Dict:
         """Symulacja scenariuszy wartości długu."""
-        scenarios = np.random.normal(base_value, base_value * 0.2, num_scenarios)
-        scenarios *= np.random.binomial(1, recovery_prob, num_scenarios)
-        
-        return {
-            'expected_value': np.mean(scenarios),
-            'var_95': np.percentile(scenarios, 5),
-            'var_99': np.percentile(scenarios, 1),
-            'max_loss': np.min(scenarios),
-            'max_gain': np.max(scenarios)
-        }
+        engine = MonteCarloEngine(seed=seed, quantile_method='exact')
+        results = engine.simulate(np.array([base_value]), np.array([recovery_prob]), num_scenarios)
+
+        return {key: values[0] for key, values in results['debts'].items()}
 
     def generate_pricing_recommendation(self,
                                      valuation_results: Dict,
@@ -99,14 +128,74 @@ class DebtValuation:
     def _generate_pricing_justification(self, results: Dict) -> List[str]:
         """Generowanie uzasadnienia dla wyceny."""
         justification = []
-        
+
         if results['expected_value'] > results['var_95'] * 1.5:
             justification.append("Wysoka zmienność wartości - zalecana ostrożność")
-            
+
         if results['max_loss'] < results['expected_value'] * 0.5:
             justification.append("Znaczące ryzyko straty - rozważ zabezpieczenia")
-            
+
         if results['max_gain'] > results['expected_value'] * 2:
             justification.append("Potencjał wysokiego zwrotu - rozważ agresywniejszą wycenę")
-            
-        return justification 
\ No newline at end of file
+
+        return justification
+
+    def price_portfolio(self,
+                        claims: pd.DataFrame,
+                        market_factors: Optional[Dict[str, float]] = None,
+                        risk_appetite: float = 0.5,
+                        num_scenarios: int = 1000,
+                        seed: Optional[int] = None,
+                        engine: Optional[MonteCarloEngine] = None) -> pd.DataFrame:
+        """Wektorowa wycena całego portfela wierzytelności.
+
+        Oczekiwane kolumny: debt_amount, age, risk_category oraz recovery_prob
+        lub risk_score (gdy model odzysku jest wytrenowany). Czynniki rynkowe
+        mogą być podane jako kolumny portfela lub wspólny słownik.
+        """
+        base_values = self.calculate_base_values(claims)
+        adjusted_values = base_values * self._market_multipliers(claims, market_factors)
+
+        if 'recovery_prob' in claims.columns:
+            recovery_probs = claims['recovery_prob'].to_numpy(dtype=float)
+        else:
+            recovery_probs = self.predict_recovery_probabilities(claims)
+
+        engine = engine or MonteCarloEngine(seed=seed)
+        results = engine.simulate(adjusted_values, recovery_probs, num_scenarios)['debts']
+
+        priced = claims.copy()
+        priced['base_value'] = base_values
+        priced['adjusted_value'] = adjusted_values
+        priced['recovery_prob'] = recovery_probs
+        for key, values in results.items():
+            priced[key] = values
+        priced['rekomendowana_cena'] = (results['var_95'] * (1 - risk_appetite) +
+                                        results['expected_value'] * risk_appetite)
+        return priced
+
+    def calculate_base_values(self, claims: pd.DataFrame) -> np.ndarray:
+        """Wektorowe obliczenie bazowej wartości dla portfela długów."""
+        weights = claims['risk_category'].map(self.risk_weights).to_numpy(dtype=float)
+        if np.isnan(weights).any():
+            unknown = claims.loc[np.isnan(weights), 'risk_category'].unique()
+            raise KeyError(f"Nieznane kategorie ryzyka: {', '.join(map(str, unknown))}")
+
+        amounts = claims['debt_amount'].to_numpy(dtype=float)
+        age_discount = np.maximum(0, 1 - claims['age'].to_numpy(dtype=float) / 60)
+        return amounts * weights * age_discount
+
+    def _market_multipliers(self,
+                            claims: pd.DataFrame,
+                            market_factors: Optional[Dict[str, float]]) -> np.ndarray:
+        """Mnożniki rynkowe dla każdego długu (kolumny portfela mają pierwszeństwo)."""
+        market_factors = market_factors or {}
+        multipliers = np.ones(len(claims))
+
+        for factor, sensitivity in self.market_sensitivities.items():
+            if factor in claims.columns:
+                multipliers *= 1 + claims[factor].to_numpy(dtype=float) * sensitivity
+            elif factor in market_factors:
+                multipliers *= 1 + market_factors[factor] * sensitivity
+
+        return multipliers
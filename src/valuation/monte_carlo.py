@@ -0,0 +1,170 @@
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+from common.quantile_sketch import QuantileSketch
+
+# Wartości scenariuszy sumowane są w groszach (int64), dzięki czemu wynik
+# portfelowy nie zależy od kolejności sumowania bloków.
+CENTS = 100
+
+DEBT_STATS = ('expected_value', 'var_95', 'var_99', 'max_loss', 'max_gain')
+
+
+def block_seed(entropy: int, debt_block: int, scenario_block: int) -> np.random.SeedSequence:
+    """Niezależny strumień losowy dla bloku (długi × scenariusze)."""
+    return np.random.SeedSequence(entropy, spawn_key=(debt_block, scenario_block))
+
+
+def simulate_debt_block(base_values: np.ndarray,
+                        recovery_probs: np.ndarray,
+                        num_scenarios: int,
+                        entropy: int,
+                        debt_block: int,
+                        block_scenarios: int,
+                        volatility: float,
+                        exact: bool,
+                        sketch_bins: int) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """Symulacja jednego bloku długów dla wszystkich scenariuszy.
+
+    Zwraca statystyki per dług oraz sumy wartości portfela w groszach
+    dla każdego scenariusza (wkład tego bloku).
+    """
+    n = len(base_values)
+    base = base_values[:, None]
+    prob = recovery_probs[:, None]
+
+    totals = np.zeros(num_scenarios, dtype=np.int64)
+    sums = np.zeros(n, dtype=np.int64)
+    minimum = np.full(n, np.inf)
+    maximum = np.full(n, -np.inf)
+
+    if exact:
+        values_all = np.empty((n, num_scenarios))
+    else:
+        spread = 6 * volatility * np.abs(base_values)
+        sketch = QuantileSketch(np.minimum(0, base_values - spread),
+                                np.maximum(0, base_values + spread),
+                                bins=sketch_bins)
+
+    for scenario_block, start in enumerate(range(0, num_scenarios, block_scenarios)):
+        stop = min(start + block_scenarios, num_scenarios)
+        rng = np.random.default_rng(block_seed(entropy, debt_block, scenario_block))
+
+        values = rng.normal(base, np.abs(base) * volatility, (n, stop - start))
+        values *= rng.random((n, stop - start)) < prob
+
+        cents = np.rint(values * CENTS).astype(np.int64)
+        totals[start:stop] = cents.sum(axis=0)
+        sums += cents.sum(axis=1)
+        np.minimum(minimum, values.min(axis=1), out=minimum)
+        np.maximum(maximum, values.max(axis=1), out=maximum)
+
+        if exact:
+            values_all[:, start:stop] = values
+        else:
+            sketch.update(values)
+
+    if exact:
+        var_95, var_99 = np.percentile(values_all, [5, 1], axis=1)
+    else:
+        var_95, var_99 = sketch.quantile(0.05), sketch.quantile(0.01)
+
+    stats = {
+        'expected_value': sums / CENTS / num_scenarios,
+        'var_95': var_95,
+        'var_99': var_99,
+        'max_loss': minimum,
+        'max_gain': maximum
+    }
+    return stats, totals
+
+
+class MonteCarloEngine:
+    """Powtarzalny silnik Monte Carlo dla portfela wierzytelności.
+
+    Portfel symulowany jest w blokach (długi × scenariusze), każdy z własnym
+    strumieniem `SeedSequence`, więc wynik zależy tylko od ziarna i rozmiarów
+    bloków - nie od kolejności ani sposobu przetwarzania. Pamięć ograniczona
+    jest rozmiarem bloku; rozkład portfela przechowywany jest jako wektor
+    długości `num_scenarios`.
+    """
+
+    def __init__(self,
+                 seed: Optional[int] = None,
+                 block_debts: int = 64,
+                 block_scenarios: int = 65536,
+                 quantile_method: str = 'auto',
+                 sketch_bins: int = 512,
+                 max_exact_elements: int = 2 ** 24,
+                 volatility: float = 0.2):
+        if quantile_method not in ('auto', 'exact', 'sketch'):
+            raise ValueError(f"Nieznana metoda kwantyli: {quantile_method}")
+
+        # Zapamiętana entropia pozwala odtworzyć wynik także bez jawnego ziarna
+        self.entropy = np.random.SeedSequence(seed).entropy
+        self.block_debts = block_debts
+        self.block_scenarios = block_scenarios
+        self.quantile_method = quantile_method
+        self.sketch_bins = sketch_bins
+        self.max_exact_elements = max_exact_elements
+        self.volatility = volatility
+
+    def use_exact_quantiles(self, num_scenarios: int) -> bool:
+        """Czy kwantyle per dług liczone są dokładnie (cały blok w pamięci)."""
+        if self.quantile_method == 'auto':
+            return self.block_debts * num_scenarios <= self.max_exact_elements
+        return self.quantile_method == 'exact'
+
+    def simulate(self,
+                 base_values: np.ndarray,
+                 recovery_probs: np.ndarray,
+                 num_scenarios: int = 1000,
+                 return_distribution: bool = False) -> Dict:
+        """Symulacja portfela - statystyki per dług i rozkład wartości portfela."""
+        base_values = np.asarray(base_values, dtype=float)
+        recovery_probs = np.broadcast_to(np.asarray(recovery_probs, dtype=float),
+                                         base_values.shape)
+        exact = self.use_exact_quantiles(num_scenarios)
+
+        debt_stats = {key: np.empty(len(base_values)) for key in DEBT_STATS}
+        totals = np.zeros(num_scenarios, dtype=np.int64)
+
+        for debt_block, start in enumerate(range(0, len(base_values), self.block_debts)):
+            stop = min(start + self.block_debts, len(base_values))
+            stats, block_totals = simulate_debt_block(
+                base_values[start:stop], recovery_probs[start:stop], num_scenarios,
+                self.entropy, debt_block, self.block_scenarios, self.volatility,
+                exact, self.sketch_bins
+            )
+            for key in DEBT_STATS:
+                debt_stats[key][start:stop] = stats[key]
+            totals += block_totals
+
+        return self.summarize(debt_stats, totals, return_distribution)
+
+    def summarize(self,
+                  debt_stats: Dict[str, np.ndarray],
+                  totals: np.ndarray,
+                  return_distribution: bool = False) -> Dict:
+        """Agregacja wyników do rozkładu wartości portfela."""
+        portfolio_values = totals / CENTS
+        var_95, var_99 = np.percentile(portfolio_values, [5, 1])
+        expected_value = portfolio_values.mean()
+
+        results = {
+            'debts': debt_stats,
+            'portfolio': {
+                'expected_value': expected_value,
+                'std': portfolio_values.std(),
+                'var_95': var_95,
+                'var_99': var_99,
+                # Oczekiwana wartość w najgorszych 5% scenariuszy
+                'expected_shortfall_95': portfolio_values[portfolio_values <= var_95].mean(),
+                'max_loss': portfolio_values.min(),
+                'max_gain': portfolio_values.max()
+            },
+            'entropy': self.entropy
+        }
+        if return_distribution:
+            results['portfolio_values'] = portfolio_values
+        return results
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Moduły importowane są tak jak przy uruchamianiu z katalogu src (PYTHONPATH=src)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
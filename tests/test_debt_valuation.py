@@ -0,0 +1,23 @@
+import pytest
+
+from valuation.debt_valuation import DebtValuation
+
+
+def test_single_debt_pricing_end_to_end():
+    valuation = DebtValuation()
+    base_value = valuation.calculate_base_value(10000, age_of_debt=12, risk_category='Średnie ryzyko')
+    results = valuation.simulate_scenarios(base_value, recovery_prob=0.6, num_scenarios=2000, seed=42)
+
+    recommendation = valuation.generate_pricing_recommendation(results, risk_appetite=0.25)
+
+    price_range = recommendation['przedział_cenowy']
+    assert price_range == {'min': results['var_95'], 'max': results['expected_value']}
+    assert recommendation['rekomendowana_cena'] == pytest.approx(
+        0.75 * results['var_95'] + 0.25 * results['expected_value'])
+    # Przy prawdopodobieństwie odzysku 0.6 część scenariuszy kończy się zerowym odzyskiem,
+    # a najlepsze przekraczają dwukrotność wartości oczekiwanej
+    assert recommendation['uzasadnienie'] == [
+        "Wysoka zmienność wartości - zalecana ostrożność",
+        "Znaczące ryzyko straty - rozważ zabezpieczenia",
+        "Potencjał wysokiego zwrotu - rozważ agresywniejszą wycenę"
+    ]
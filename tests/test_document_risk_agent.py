@@ -0,0 +1,133 @@
+import copy
+import math
+import pickle
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from agents.benchmark import random_application
+from agents.document_risk_agent import DOCUMENT_SCHEMA, INVALID_VALUES_MESSAGE, DocumentRiskAgent
+
+COMPONENTS = ['financial_stability', 'income_reliability', 'employment_stability',
+              'credit_history', 'assets']
+
+
+@pytest.fixture
+def agent():
+    return DocumentRiskAgent()
+
+
+@pytest.fixture
+def complete_application():
+    return {
+        'financial_statement': {'assets': 1000000, 'liabilities': 300000, 'revenue': 500000, 'profit': 100000},
+        'income_statement': {'monthly_income': 8000, 'employment_period': 36, 'position': 'Specjalista'},
+        'employment_contract': {'contract_type': 'permanent', 'start_date': '2020-01-01', 'salary': 8000},
+        'credit_history': {'credit_score': 0.85, 'payment_history': 0.95, 'active_loans': 1}
+    }
+
+
+def assert_same_result(row, expected):
+    assert row['status'] == expected['status']
+    if expected['status'] == 'error':
+        assert row['message'] == expected['message']
+        assert row['missing_documents'] == expected['missing_documents']
+        return
+
+    assert row['overall_score'] == expected['overall_score']
+    assert row['risk_category'] == expected['risk_category']
+    assert row['recommendations'] == expected['recommendations']
+    for component in COMPONENTS:
+        assert row[component] == expected['components'][component]
+
+
+def test_batch_matches_single_application_path(agent):
+    rng = np.random.default_rng(0)
+    applications = [random_application(rng, missing_rate=0.2) for _ in range(2000)]
+
+    results = agent.assess_applications(applications).to_dict('records')
+
+    assert {row['status'] for row in results} == {'success', 'error'}
+    for application, row in zip(applications, results):
+        assert_same_result(row, agent.calculate_risk_score(agent.validate_documents(application)))
+
+
+def test_incomplete_application_with_non_numeric_field_matches_single_path(agent, complete_application):
+    malformed = {'financial_statement': {'assets': 'n/a', 'liabilities': 1, 'revenue': 1, 'profit': 1}}
+
+    results = agent.assess_applications([complete_application, malformed]).to_dict('records')
+
+    assert_same_result(results[0], agent.calculate_risk_score(agent.validate_documents(complete_application)))
+    assert_same_result(results[1], agent.calculate_risk_score(agent.validate_documents(malformed)))
+
+
+@pytest.mark.parametrize('doc_key, field, value', [
+    ('financial_statement', 'assets', 'abc'),
+    ('credit_history', 'credit_score', None),
+    ('employment_contract', 'contract_type', ['permanent']),
+    ('property_valuation', 'property_value', {'value': 1})
+])
+def test_non_numeric_value_fails_only_its_row(agent, complete_application, doc_key, field, value):
+    malformed = copy.deepcopy(complete_application)
+    malformed.setdefault(doc_key, {'property_value': 0, 'valuation_date': '2024-01-01', 'property_type': 'dom'})
+    malformed[doc_key][field] = value
+
+    results = agent.assess_applications([complete_application, malformed, complete_application])
+
+    assert list(results['status']) == ['success', 'error', 'success']
+    assert results.loc[1, 'message'] == INVALID_VALUES_MESSAGE
+    assert results.loc[1, 'missing_documents'] == [DOCUMENT_SCHEMA[doc_key].name]
+    assert math.isnan(results.loc[1, 'overall_score'])
+    assert results.loc[0, 'overall_score'] == results.loc[2, 'overall_score']
+
+
+
+@pytest.mark.parametrize('doc_key, value', [
+    ('financial_statement', {'assets': '1000000', 'liabilities': 1, 'revenue': 1, 'profit': 1}),
+    ('financial_statement', {'assets': Decimal('1000000'), 'liabilities': 1, 'revenue': 1, 'profit': 1}),
+    ('financial_statement', {'assets': 1000000, 'liabilities': 1, 'revenue': float('inf'), 'profit': 1}),
+    ('income_statement', {'monthly_income': float('nan'), 'employment_period': 36, 'position': 'x'}),
+    ('credit_history', {'credit_score': True, 'payment_history': 0.9, 'active_loans': 1}),
+    ('employment_contract', ['permanent']),
+    ('employment_contract', 'permanent'),
+    ('property_valuation', None),
+    ('property_valuation', [1000000]),
+    ('property_valuation', {'property_value': '500000'})
+])
+def test_malformed_input_gives_same_result_on_both_paths(agent, complete_application, doc_key, value):
+    malformed = copy.deepcopy(complete_application)
+    malformed[doc_key] = value
+
+    results = agent.assess_applications([complete_application, malformed, complete_application])
+    rows = results.to_dict('records')
+
+    assert_same_result(rows[1], agent.calculate_risk_score(agent.validate_documents(malformed)))
+    assert rows[0]['status'] == rows[2]['status'] == 'success'
+
+
+def test_documents_are_immutable_copies_and_picklable(agent, complete_application):
+    documents = agent.validate_documents(complete_application)
+    complete_application['financial_statement']['assets'] = 0
+
+    document = documents['financial_statement']
+    assert document.content['assets'] == 1000000
+    with pytest.raises(TypeError):
+        document.content['assets'] = 1
+
+    for restored in (pickle.loads(pickle.dumps(documents)), copy.deepcopy(documents)):
+        assert restored == documents
+        assert agent.calculate_risk_score(restored) == agent.calculate_risk_score(documents)
+
+
+@pytest.mark.parametrize('content', [['assets', 'liabilities'], 'assets liabilities revenue profit', None, 42])
+def test_non_mapping_content_marks_document_invalid(agent, complete_application, content):
+    complete_application['financial_statement'] = content
+
+    documents = agent.validate_documents(complete_application)
+
+    document = documents['financial_statement']
+    assert document.provided and not document.validation_status
+    assert document.content == {}
+    assert document.validation_message == "Brakujące pola: assets, liabilities, revenue, profit"
+    assert agent.calculate_risk_score(documents)['missing_documents'] == ["Sprawozdanie finansowe"]
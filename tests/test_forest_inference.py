@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from risk_analysis.credit_scoring import CreditScoring
+from risk_analysis.forest_inference import CompiledForest
+
+
+@pytest.fixture(scope='module')
+def training_data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(2000, 6))
+    y = (X[:, 0] + 0.5 * X[:, 1] + rng.normal(size=len(X)) > 0).astype(int)
+    return X, y
+
+
+@pytest.fixture(scope='module')
+def forest(training_data):
+    X, y = training_data
+    return RandomForestClassifier(n_estimators=50, random_state=42).fit(X, y)
+
+
+def test_compiled_forest_matches_predict_proba(forest, training_data):
+    X, _ = training_data
+    compiled = CompiledForest.from_sklearn(forest)
+    expected = forest.predict_proba(X)[:, 1]
+
+    np.testing.assert_allclose(compiled.predict(X), expected, rtol=0, atol=1e-12)
+    np.testing.assert_allclose(compiled.predict(X[:50]), expected[:50], rtol=0, atol=1e-12)
+    for row in range(0, len(X), 97):
+        assert compiled.predict_one(X[row]) == pytest.approx(expected[row], abs=1e-12)
+
+
+def test_values_at_split_thresholds_follow_float32_comparison(forest):
+    # Wartości tuż przy progach - sklearn porównuje je po rzutowaniu do float32
+    tree = forest.estimators_[0].tree_
+    splits = tree.children_left != -1
+    thresholds = tree.threshold[splits]
+    features = tree.feature[splits]
+    X = np.zeros((len(thresholds) * 5, forest.n_features_in_))
+    for shift, candidates in enumerate([
+        thresholds,
+        np.nextafter(thresholds, np.inf),
+        np.nextafter(thresholds, -np.inf),
+        np.nextafter(thresholds.astype(np.float32), np.float32(np.inf)).astype(np.float64),
+        np.nextafter(thresholds.astype(np.float32), np.float32(-np.inf)).astype(np.float64)
+    ]):
+        rows = np.arange(len(thresholds)) * 5 + shift
+        X[rows, features] = candidates
+
+    compiled = CompiledForest.from_sklearn(forest)
+    np.testing.assert_allclose(compiled.predict(X), forest.predict_proba(X)[:, 1], rtol=0, atol=1e-12)
+
+
+def test_saved_forest_is_memory_mapped(forest, training_data, tmp_path):
+    X, _ = training_data
+    CompiledForest.from_sklearn(forest).save(str(tmp_path))
+
+    loaded = CompiledForest.load(str(tmp_path), mmap_mode='r')
+
+    assert isinstance(loaded.threshold.base, np.memmap)
+    np.testing.assert_allclose(loaded.predict(X), forest.predict_proba(X)[:, 1], rtol=0, atol=1e-12)
+
+
+def test_credit_scoring_artifact_round_trip(training_data, tmp_path):
+    X, y = training_data
+    columns = ['income', 'debt_ratio', 'payment_history', 'credit_history_length',
+               'num_defaults', 'employment_length']
+    data = pd.DataFrame(X, columns=columns)
+    scoring = CreditScoring()
+    scoring.fit(data, y)
+    expected = scoring.predict_risk_score(scoring.prepare_features(data))
+
+    path = str(tmp_path / 'credit_scoring.joblib')
+    scoring.save_model(path)
+    loaded = CreditScoring()
+    loaded.load_model(path)
+
+    # Duża partia trafia do estymatora sklearn, pojedynczy wiersz do skompilowanego lasu
+    np.testing.assert_allclose(loaded.predict_risk_score(loaded.prepare_features(data)),
+                               expected, rtol=0, atol=1e-12)
+    np.testing.assert_allclose(loaded.predict_risk_score(loaded.prepare_features(data.head(1))),
+                               expected[:1], rtol=0, atol=1e-12)
+
+    # Wczytany model można ponownie zapisać i skompilować
+    resaved = str(tmp_path / 'resaved.joblib')
+    loaded.save_model(resaved)
+    loaded.compile_model()
+    reloaded = CreditScoring()
+    reloaded.load_model(resaved)
+    np.testing.assert_allclose(reloaded.predict_risk_score(reloaded.prepare_features(data)),
+                               expected, rtol=0, atol=1e-12)
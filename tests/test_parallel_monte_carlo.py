@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from valuation.monte_carlo import MonteCarloEngine
+from valuation.parallel import ParallelMonteCarloEngine
+
+
+@pytest.fixture(scope='module')
+def portfolio():
+    rng = np.random.default_rng(0)
+    return rng.lognormal(8, 1, 300), rng.uniform(0.1, 0.9, 300)
+
+
+@pytest.mark.parametrize('quantile_method', ['exact', 'sketch'])
+@pytest.mark.parametrize('max_workers', [1, 3])
+def test_parallel_is_bit_identical_to_sequential(portfolio, quantile_method, max_workers):
+    base_values, recovery_probs = portfolio
+    params = dict(seed=2024, block_debts=32, block_scenarios=1024, quantile_method=quantile_method)
+
+    expected = MonteCarloEngine(**params).simulate(base_values, recovery_probs, num_scenarios=3000,
+                                                   return_distribution=True)
+    result = ParallelMonteCarloEngine(max_workers=max_workers, **params).simulate(
+        base_values, recovery_probs, num_scenarios=3000, return_distribution=True
+    )
+
+    assert result['portfolio'].keys() == expected['portfolio'].keys()
+    for key, value in expected['portfolio'].items():
+        np.testing.assert_array_equal(result['portfolio'][key], value)
+    for key, value in expected['debts'].items():
+        np.testing.assert_array_equal(result['debts'][key], value)
+
+
+def test_same_seed_reproduces_result(portfolio):
+    base_values, recovery_probs = portfolio
+    first = MonteCarloEngine(seed=7).simulate(base_values, recovery_probs, num_scenarios=2000)
+    second = MonteCarloEngine(seed=7).simulate(base_values, recovery_probs, num_scenarios=2000)
+
+    assert first['portfolio'] == second['portfolio']
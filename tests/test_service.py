@@ -0,0 +1,96 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from agents.benchmark import random_application
+from agents.document_risk_agent import DocumentRiskAgent
+from agents.service import RiskAssessmentService, _post, coerce_documents
+
+
+def run_with_service(scenario, **params):
+    """Uruchomienie scenariusza na serwisie nasłuchującym na wolnym porcie."""
+    async def main():
+        service = RiskAssessmentService(max_workers=2, **params)
+        server = await service.start(port=0)
+        try:
+            return await scenario(service, server.sockets[0].getsockname()[1])
+        finally:
+            await service.close()
+    return asyncio.run(main())
+
+
+async def post(port, payload):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        return await _post(reader, writer, '/api/v1/risk-assessment', payload)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+@pytest.fixture
+def applications():
+    rng = np.random.default_rng(0)
+    return [random_application(rng, missing_rate=0) for _ in range(2)]
+
+
+def test_malformed_application_does_not_break_its_micro_batch(applications):
+    malformed = {'financial_statement': {'assets': 'abc', 'liabilities': 1, 'revenue': 1, 'profit': 1}}
+    payloads = [{'client_id': i, 'documents': documents}
+                for i, documents in enumerate([applications[0], malformed, applications[1]])]
+
+    async def scenario(service, port):
+        return await asyncio.gather(*(post(port, payload) for payload in payloads))
+
+    # Długi czas zbierania partii - wszystkie trzy wnioski trafiają do jednej
+    responses = run_with_service(scenario, batch_timeout_ms=200)
+
+    assert [status for status, _ in responses] == [200, 400, 200]
+    assert 'financial_statement.assets' in responses[1][1]['error']
+    agent = DocumentRiskAgent()
+    for (_, body), documents in zip([responses[0], responses[2]], applications):
+        assert body['overall_score'] == agent.assess_documents(documents)['overall_score']
+
+
+def test_failed_batch_is_retried_per_application(applications):
+    async def scenario(service, port):
+        # Wniosek z pominięciem walidacji - ocena całej partii zgłasza wyjątek
+        return await asyncio.gather(
+            service.assess(applications[0]),
+            service.assess(5),
+            service.assess(applications[1]),
+            return_exceptions=True
+        ), service.metrics()
+
+    (first, broken, second), metrics = run_with_service(scenario, batch_timeout_ms=200)
+
+    assert first['status'] == 'success' and second['status'] == 'success'
+    assert isinstance(broken, Exception)
+    assert metrics['batch_retries'] == 1
+
+
+def test_unexpected_error_returns_500(applications):
+    async def scenario(service, port):
+        async def failing_route(*args):
+            raise RuntimeError("awaria")
+        service._route = failing_route
+        return await post(port, {'client_id': 1, 'documents': applications[0]})
+
+    status, body = run_with_service(scenario)
+
+    assert status == 500
+    assert 'RuntimeError' in body['error']
+
+
+def test_coerce_documents_converts_numeric_strings(applications):
+    documents = {key: {field: str(value) if isinstance(value, (int, float)) else value
+                       for field, value in content.items()}
+                 for key, content in applications[0].items()}
+
+    coerced = coerce_documents(documents)
+
+    agent = DocumentRiskAgent()
+    assert agent.assess_documents(coerced) == agent.assess_documents(applications[0])
+    with pytest.raises(ValueError):
+        coerce_documents({'credit_history': {'credit_score': float('nan')}})